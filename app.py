@@ -1,14 +1,79 @@
+import os
+
 import streamlit as st
 import pandas as pd
-from model import MenuRecommender, load_menu_data
+from catalog import MenuDirectory, load_menu_frame
+from charts import chart_cache
+from deadline import Deadline
+from model import load_menu_data, generate_flexible_combo
+from engine_cache import EngineCache, EnginePool
+from plan_table import PlanTable, TableBuilder, table_path
 
 st.set_page_config(page_title="Restaurants  Taste-Based Menu Planner", layout="centered")
 
 st.markdown("<h1 style='text-align:center; color:#FF5722;'>🍽️ Personalized 3-Day Menu Plan</h1>", unsafe_allow_html=True)
 st.markdown("<p style='text-align:center;'>Start with your favorite taste and let ai generate a smart 3-day meal journey 🍛🥗🥤</p>", unsafe_allow_html=True)
 
-df = load_menu_data()
-recommender = MenuRecommender(df)
+
+# One engine cache per server process, shared by every session and rerun
+@st.cache_resource
+def get_engine_cache():
+    return EngineCache(max_size=8)
+
+
+# MENU_DIR serves many restaurants from one process: one menu per restaurant in the directory,
+# engines built on first use and evicted least recently used first past MENU_MEMORY_MB
+@st.cache_resource
+def get_engine_pool(menu_dir, memory_mb):
+    return EnginePool(MenuDirectory(menu_dir), max_bytes=int(memory_mb * 2 ** 20))
+
+
+# MENU_PATH may name a CSV/Parquet export or a prebuilt snapshot directory; the snapshot is
+# memory-mapped, so restarts skip parsing. The mtime key reloads it when the export changes.
+@st.cache_resource
+def get_menu(path, mtime_ns):
+    return load_menu_frame(path)
+
+
+# Plans for every slider setting, one table per menu hash and scoring spec. A menu without a table
+# (a new or edited menu) gets one built in a background process while it is planned live as before,
+# as is any setting outside the table. The mtime key picks up the finished file on the next rerun.
+PLAN_TABLE_DIR = os.environ.get('PLAN_TABLE_DIR', '.plan_tables')
+
+
+@st.cache_resource
+def get_table_builder(directory):
+    return TableBuilder(directory)
+
+
+@st.cache_resource(max_entries=8)
+def get_plan_table(path, mtime_ns, _recommender):
+    table = PlanTable.load(path)
+    return table if table.matches(_recommender) else None
+
+
+MENU_DIR = os.environ.get('MENU_DIR')
+MENU_PATH = os.environ.get('MENU_PATH')
+if MENU_DIR:
+    engine_pool = get_engine_pool(MENU_DIR, float(os.environ.get('MENU_MEMORY_MB', 512)))
+    restaurants = MenuDirectory(MENU_DIR).restaurants() if os.path.isdir(MENU_DIR) else []
+    if not restaurants:
+        st.error(f"MENU_DIR {MENU_DIR!r} holds no menus: add one <restaurant>.csv or .parquet export "
+                 "(or a prebuilt .snapshot directory) per restaurant, or unset MENU_DIR to use the sample menu.")
+        st.stop()
+    restaurant = st.sidebar.selectbox("Restaurant", restaurants)
+    recommender = engine_pool.get(restaurant)
+    df = recommender.data
+else:
+    df = get_menu(MENU_PATH, os.stat(MENU_PATH).st_mtime_ns) if MENU_PATH else load_menu_data()
+    recommender = get_engine_cache().get(df)
+table_builder = get_table_builder(PLAN_TABLE_DIR)
+table_file = table_path(PLAN_TABLE_DIR, recommender)
+if table_file.exists():
+    plan_table = get_plan_table(str(table_file), table_file.stat().st_mtime_ns, recommender)
+else:
+    plan_table = None
+    table_builder.submit(recommender)
 
 # Sidebar filters
 st.sidebar.header("Plan Configuration")
@@ -19,69 +84,55 @@ min_cal = st.sidebar.slider("Minimum Calories", 500, 1000, 700)
 max_cal = st.sidebar.slider("Maximum Calories", 600, 1200, 900)
 min_pop = st.sidebar.slider("Minimum Popularity", 0.0, 1.0, 0.7)
 
-# Combo logic
-def generate_flexible_combo(recommender, preferred_taste, calorie_range, min_popularity):
-    all_combos = recommender.generate_all_combos()
-    combos = all_combos[
-        (all_combos['total_calories'] >= calorie_range[0]) &
-        (all_combos['total_calories'] <= calorie_range[1]) &
-        (all_combos['avg_popularity'] >= min_popularity)
-    ].copy()
-
-    if len(combos) < 10:
-        combos = all_combos.nlargest(30, 'combo_score')
-    
-    combos = combos.sort_values("combo_score", ascending=False)
-    selected = []
-    used_items = set()
-    used_tastes = set()
-
-    # Day 1 → must match taste
-    for _, row in combos.iterrows():
-        if preferred_taste in {row['main_taste'], row['side_taste'], row['drink_taste']}:
-            items = {row['main'], row['side'], row['drink']}
-            if not used_items.intersection(items):
-                selected.append(row)
-                used_items.update(items)
-                used_tastes.update([row['main_taste'], row['side_taste'], row['drink_taste']])
-                break
-
-    # Day 2 and 3 → must have different tastes
-    for _, row in combos.iterrows():
-        if len(selected) >= 3:
-            break
-        items = {row['main'], row['side'], row['drink']}
-        tastes = {row['main_taste'], row['side_taste'], row['drink_taste']}
-        if not used_items.intersection(items) and not tastes.intersection(used_tastes):
-            selected.append(row)
-            used_items.update(items)
-            used_tastes.update(tastes)
-
-    # Fill remaining if necessary (with less strict taste condition)
-    for _, row in combos.iterrows():
-        if len(selected) >= 3:
-            break
-        items = {row['main'], row['side'], row['drink']}
-        if not used_items.intersection(items):
-            selected.append(row)
-            used_items.update(items)
-
-    return selected[:3]
+# Latency budget for plans computed live; past it the best plan found so far is shown
+PLAN_DEADLINE_MS = float(os.environ['PLAN_DEADLINE_MS']) if os.environ.get('PLAN_DEADLINE_MS') else None
+
+# Debug panel, only with MENU_DEBUG set; filled in at the end of the run so it includes this request
+DEBUG = bool(os.environ.get('MENU_DEBUG'))
+profile_next = False
+if DEBUG:
+    debug_panel = st.sidebar.expander("Debug metrics")
+    profile_next = debug_panel.checkbox("Profile the next recommendation")
+    if debug_panel.button("Reset metrics"):
+        recommender.metrics.reset()
+
+# Menu analytics, rendered in the background while the plan is computed and shown at the end of the run
+SHOW_ANALYTICS = st.sidebar.checkbox("Show menu analytics")
+analysis_chart = recommender.render_analysis(background=True) if SHOW_ANALYTICS else None
+plan_chart = None
 
 # Recommend button
 if st.button("🎯 Recommend 3-Day Plan"):
     with st.spinner("Analyzing menus..."):
-        final_combos = generate_flexible_combo(
-            recommender,
-            preferred_taste,
-            (min_cal, max_cal),
-            min_pop
-        )
+        final_combos = None
+        deadline = Deadline(PLAN_DEADLINE_MS) if PLAN_DEADLINE_MS else None
+        if plan_table is not None and not profile_next:
+            final_combos = plan_table.combos(recommender, preferred_taste, (min_cal, max_cal), min_pop)
+        if final_combos is not None:
+            recommender.metrics.count('plan_table.hits')
+        elif profile_next:
+            with recommender.metrics.profile():
+                final_combos = generate_flexible_combo(recommender, preferred_taste, (min_cal, max_cal), min_pop)
+        else:
+            final_combos = generate_flexible_combo(
+                recommender,
+                preferred_taste,
+                (min_cal, max_cal),
+                min_pop,
+                deadline=deadline
+            )
 
     if len(final_combos) < 3:
         st.error(" Could not generate 3 unique combos even after fallback. Please change your taste or relax filters.")
     else:
         st.success("Your customized 3-day menu is ready!")
+        if deadline is not None and deadline.interrupted:
+            quality = deadline.report()
+            st.caption(f"Best plan found in {quality['elapsed_ms']:.0f} ms; a day's combo score could be up to "
+                       f"{quality['optimality_gap']:.3f} higher with a full search.")
+
+        if SHOW_ANALYTICS:
+            plan_chart = recommender.render_recommendations(final_combos, background=True)
 
         plan_days = [start_day]
         all_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -118,3 +169,27 @@ if st.button("🎯 Recommend 3-Day Plan"):
             🎨 Taste Diversity: `{combo['taste_diversity']}`  
             🏆 Combo Score: `{combo['combo_score']:.3f}`
             """)
+
+if SHOW_ANALYTICS:
+    with st.expander("Menu analytics", expanded=True):
+        if plan_chart is not None:
+            st.image(plan_chart.result())
+        st.image(analysis_chart.result())
+
+if DEBUG:
+    # Metrics of the shared engine, aggregated over every session in this server process
+    with debug_panel:
+        snapshot = recommender.metrics.snapshot()
+        if snapshot['stages']:
+            st.dataframe(pd.DataFrame(snapshot['stages']).T)
+        st.json(snapshot['counters'])
+        if MENU_DIR:
+            st.json(engine_pool.stats())
+        st.json(chart_cache.stats())
+        if plan_table is not None:
+            st.caption(f"Plan table: {len(plan_table.plans)} plans, {plan_table.nbytes / 1024:.0f} KB")
+        else:
+            st.caption(f"No plan table for this menu in {PLAN_TABLE_DIR} ({table_builder.status(recommender)}); "
+                       "plans are computed live")
+        if recommender.metrics.last_profile:
+            st.code(recommender.metrics.last_profile)
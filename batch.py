@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from catalog import load_menu_frame
+from deadline import Deadline
+from model import DAYS, MenuRecommender, generate_flexible_combo, load_menu_data, plan_records
+
+# Request columns that decide the plan; customers sharing all of them share one planning run
+PLAN_COLUMNS = ['preferred_taste', 'min_cal', 'max_cal', 'min_popularity', 'days']
+DEFAULTS = {'preferred_taste': '', 'min_cal': 700, 'max_cal': 900, 'min_popularity': 0.7, 'days': 3}
+
+_engine = None
+_deadline_ms = None
+
+
+def _init_worker(engine, deadline_ms=None):
+    global _engine, _deadline_ms
+    _engine = engine
+    _deadline_ms = deadline_ms
+
+
+def _plan_group(params):
+    # (combos, quality); quality is None without a per-plan deadline
+    preferred_taste, min_cal, max_cal, min_popularity, days = params
+    calorie_range = (min_cal, max_cal)
+    deadline = Deadline(_deadline_ms) if _deadline_ms is not None else None
+    if preferred_taste:
+        combos = generate_flexible_combo(_engine, preferred_taste, calorie_range, min_popularity, days=int(days),
+                                         deadline=deadline)
+    else:
+        combos = _engine.recommend_menu(int(days), calorie_range, min_popularity, deadline=deadline)
+    return [combo.to_dict() for combo in combos], deadline and deadline.report()
+
+
+def normalize_requests(requests):
+    # Fills in defaults and validates every row: numeric limits, 1 <= days <= 366 and start_day,
+    # matched case-insensitively and written as in model.DAYS. Rows that cannot be planned get a
+    # message in 'error' (None otherwise) and are reported on their own instead of failing the batch.
+    requests = requests.copy()
+    for column, default in DEFAULTS.items():
+        if column not in requests:
+            requests[column] = default
+        requests[column] = requests[column].fillna(default)
+    if 'customer_id' not in requests:
+        requests['customer_id'] = requests.index
+    if 'start_day' not in requests:
+        requests['start_day'] = None
+    errors = pd.Series(None, index=requests.index, dtype=object)
+
+    def reject(bad, message):
+        # Keeps the first error of each row
+        errors.mask(errors.isna() & bad, message, inplace=True)
+
+    for column in ('min_cal', 'max_cal', 'min_popularity', 'days'):
+        values = pd.to_numeric(requests[column], errors='coerce')
+        reject(values.isna(), f"{column} must be a number")
+        requests[column] = values
+    days = requests['days']
+    reject(~((days >= 1) & (days <= 366) & (days % 1 == 0)), "days must be a whole number between 1 and 366")
+
+    names = {day.lower(): day for day in DAYS}
+    given = requests['start_day'].map(lambda day: day.strip() or None if isinstance(day, str) else None)
+    start_day = given.map(lambda day: names.get(day.lower()) if isinstance(day, str) else None)
+    reject(given.notna() & start_day.isna(), given.map(lambda day: f"Unknown start day: {day!r}"))
+    requests['start_day'] = start_day
+    requests['error'] = errors
+    return requests
+
+
+def plan_batch(requests, data=None, workers=None, deadline_ms=None):
+    # Yields one record per request row, in request order. The engine is built and warmed once,
+    # each distinct parameter set is planned once, and distinct sets are spread across worker
+    # processes. Invalid rows get {'customer_id', 'error'} records.
+    # deadline_ms bounds each planning run; records then carry its quality report.
+    engine = MenuRecommender(load_menu_data() if data is None else data).warm()
+    requests = normalize_requests(requests)
+    valid = requests[requests['error'].isna()]
+    # Groups in order of their first request, so each result arrives by the time a row needs it
+    keys = list(valid.groupby(PLAN_COLUMNS, sort=False).indices)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(keys) < 2:
+        _init_worker(engine, deadline_ms)
+        results = map(_plan_group, keys)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine, deadline_ms))
+        results = executor.map(_plan_group, keys, chunksize=max(1, len(keys) // (workers * 4)))
+
+    try:
+        results = zip(keys, results)
+        planned = {}
+        for request in requests[['customer_id', 'start_day', 'error', *PLAN_COLUMNS]].to_dict('records'):
+            if isinstance(request['error'], str):
+                yield {'customer_id': request['customer_id'], 'error': request['error']}
+                continue
+            key = tuple(request[column] for column in PLAN_COLUMNS)
+            while key not in planned:
+                done, result = next(results)
+                planned[done] = result
+            combos, quality = planned[key]
+            preferred_taste, min_cal, max_cal, min_popularity, _ = key
+            start_day = request['start_day'] if isinstance(request['start_day'], str) else None
+            record = {
+                'customer_id': request['customer_id'],
+                'plan': plan_records(combos, preferred_taste or None, (min_cal, max_cal), min_popularity, start_day)
+            }
+            if quality is not None:
+                record['quality'] = quality
+            yield record
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def write_jsonl(records, out):
+    count = 0
+    for record in records:
+        out.write(json.dumps(record) + '\n')
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan menus for a table of customer requests.')
+    parser.add_argument('requests', help=f"CSV with optional customer_id, start_day and {', '.join(PLAN_COLUMNS)}")
+    parser.add_argument('output', nargs='?', default='-', help='JSON lines output file (default: stdout)')
+    parser.add_argument('--menu', help='menu CSV/Parquet export or snapshot directory (default: built-in sample menu)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--deadline-ms', type=float, default=None,
+                        help='latency budget per planning run; adds a quality report to each record')
+    args = parser.parse_args()
+
+    requests = pd.read_csv(args.requests)
+    data = load_menu_frame(args.menu) if args.menu else None
+    records = plan_batch(requests, data, args.workers, args.deadline_ms)
+    if args.output == '-':
+        write_jsonl(records, sys.stdout)
+    else:
+        with open(args.output, 'w') as out:
+            count = write_jsonl(records, out)
+        print(f"Wrote {count} plans to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_pipeline import best_time, environment  # noqa: E402
+from courses import CourseItems, top_course_positions  # noqa: E402
+from synthetic_menu import EXTRA_PROFILES, synthetic_menu  # noqa: E402
+
+DEFAULT_SIZES = [30, 100]
+DEFAULT_SCHEMAS = ['main,side,drink', 'starter?,main,side,drink', 'starter?,main,side,drink,dessert?',
+                   'starter,main,side,drink,dessert']
+QUERIES = {'unfiltered': (None, None), 'filtered': ((700, 900), 0.7), 'tight': ((1100, 1300), 0.8)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Top-k combo search for course schemas of growing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='items per category')
+    parser.add_argument('--schemas', nargs='+', default=DEFAULT_SCHEMAS)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=str(ROOT / 'benchmarks' / 'results' / 'courses.json'))
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        data = synthetic_menu(n, args.seed, extra_courses=tuple(EXTRA_PROFILES))
+        for schema in args.schemas:
+            items = CourseItems(data, schema)
+            print(f"{n} items per category, {schema} ({items.n_combos:,} combos)", flush=True)
+            for name, (calorie_range, min_popularity) in QUERIES.items():
+                (positions, _), seconds = best_time(
+                    lambda: top_course_positions(items, args.k, calorie_range, min_popularity), args.repeat)
+                results.append({'items_per_category': n, 'schema': schema, 'combos': items.n_combos, 'query': name,
+                                'found': len(positions), 'seconds': round(seconds, 6)})
+                print(f"  {name:<11} {seconds * 1000:10.2f} ms  {len(positions)} found", flush=True)
+
+    report = {'environment': environment(), 'seed': args.seed, 'k': args.k, 'repeat': args.repeat,
+              'results': results}
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {len(results)} measurements to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
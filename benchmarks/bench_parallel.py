@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from bench_pipeline import best_time, environment  # noqa: E402
+from model import MenuRecommender  # noqa: E402
+from parallel import worker_pool  # noqa: E402
+from synthetic_menu import synthetic_menu  # noqa: E402
+
+DEFAULT_SIZES = [100, 150, 300]
+CALORIE_RANGE = (700, 900)
+MIN_POPULARITY = 0.7
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    return counts if counts[-1] == cores else counts + [cores]
+
+
+def engine(data, workers):
+    recommender = MenuRecommender(data)
+    recommender.workers = workers
+    recommender.max_indexed_combos = 0
+    recommender.parallel_min_combos = 0
+    return recommender
+
+
+def stages():
+    # (name, fn(recommender)) for every entry point that can run on the worker pool
+    plan = lambda r: [c.name for c in r.recommend_3_day_menu(CALORIE_RANGE, MIN_POPULARITY)]  # noqa: E731
+    yield 'top_k', lambda r: r.top_combos(1000)
+    yield 'top_k_filtered', lambda r: r.top_combos(1000, CALORIE_RANGE, MIN_POPULARITY)
+    yield 'plan', plan
+
+
+def same(a, b):
+    if isinstance(a, pd.DataFrame):
+        return a.equals(b) and a.index.equals(b.index)
+    return np.array_equal(a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs process-pool top-k search.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='items per category')
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=str(ROOT / 'benchmarks' / 'results' / 'parallel.json'))
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        data = synthetic_menu(n, args.seed)
+        print(f"{n} items per category ({n ** 3:,} combos)", flush=True)
+        for name, fn in stages():
+            serial, baseline = None, None
+            for workers in args.workers:
+                recommender = engine(data, workers)
+                if workers > 1:
+                    worker_pool(workers).submit(int).result()  # start the processes outside the timing
+                result, seconds = best_time(lambda: fn(recommender), args.repeat)
+                if serial is None:
+                    serial, baseline = result, seconds
+                elif not same(serial, result):
+                    raise AssertionError(f"{name} with {workers} workers differs from the serial result")
+                speedup = baseline / seconds if seconds else float('inf')
+                results.append({'items_per_category': n, 'combos': n ** 3, 'stage': name, 'workers': workers,
+                                'seconds': round(seconds, 6), 'speedup': round(speedup, 3)})
+                print(f"  {name:<15} {workers:>3} workers {seconds * 1000:10.2f} ms  x{speedup:5.2f}", flush=True)
+
+    report = {'environment': dict(environment(), cpu_count=os.cpu_count()), 'seed': args.seed,
+              'repeat': args.repeat, 'results': results}
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {len(results)} measurements to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
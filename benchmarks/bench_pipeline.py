@@ -0,0 +1,179 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from combo_index import ComboIndex  # noqa: E402
+from combo_store import ComboStore  # noqa: E402
+from model import MenuRecommender, generate_flexible_combo  # noqa: E402
+from planner import PlanCandidates, greedy_plan  # noqa: E402
+from synthetic_menu import synthetic_menu  # noqa: E402
+
+DEFAULT_SIZES = [10, 50, 100, 500, 1000, 5000]
+CALORIE_RANGE = (700, 900)
+MIN_POPULARITY = 0.7
+
+
+def best_time(fn, repeat):
+    # Result and best wall time over `repeat` runs, each started after a garbage collection
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def measure(fn, repeat):
+    # Best wall time over `repeat` plain runs, then one extra run under tracemalloc for peak memory
+    result, best = best_time(fn, repeat)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def _rows(result):
+    return len(result) if hasattr(result, '__len__') else None
+
+
+def _nbytes(result):
+    # Resident size of the stage output: compact stores report nbytes, DataFrames their deep usage
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    return int(result.nbytes) if hasattr(result, 'nbytes') else None
+
+
+def bench_size(n, seed, repeat, max_materialized):
+    data = synthetic_menu(n, seed)
+    n_combos = n ** 3
+    records = []
+
+    def stage(pipeline, name, fn):
+        result, seconds, peak = measure(fn, repeat)
+        records.append({
+            'items_per_category': n, 'combos': n_combos, 'pipeline': pipeline, 'stage': name,
+            'seconds': round(seconds, 6), 'peak_bytes': int(peak), 'rows': _rows(result),
+            'result_bytes': _nbytes(result),
+        })
+        print(f"  {pipeline:<12} {name:<12} {seconds * 1000:10.2f} ms  {peak / 2 ** 20:9.1f} MiB", flush=True)
+        return result
+
+    recommender = MenuRecommender(data)
+    if n_combos <= max_materialized:
+        # Materialize every combo, then filter, sort and select as separate stages
+        combos = stage('materialized', 'generate', recommender.generate_all_combos)
+        filtered = stage('materialized', 'filter', lambda: combos[
+            (combos['total_calories'] >= CALORIE_RANGE[0]) & (combos['total_calories'] <= CALORIE_RANGE[1])
+            & (combos['avg_popularity'] >= MIN_POPULARITY)])
+        ranked = stage('materialized', 'sort', lambda: filtered.sort_values(
+            'combo_score', ascending=False, kind='stable'))
+        stage('materialized', 'select', lambda: greedy_plan(PlanCandidates.from_frame(ranked.head(1000)), 3))
+
+        store = stage('compact', 'build', lambda: ComboStore.build(recommender.items))
+        index = stage('indexed', 'build', lambda: ComboIndex(store))
+        stage('indexed', 'query', lambda: index.query(CALORIE_RANGE, MIN_POPULARITY))
+        recommender.warm()
+        stage('indexed', 'plan', lambda: recommender.recommend_3_day_menu(CALORIE_RANGE, MIN_POPULARITY))
+        stage('indexed', 'plan_taste', lambda: generate_flexible_combo(
+            recommender, 'spicy', CALORIE_RANGE, MIN_POPULARITY))
+
+        # Menu edits patched into the warm engine, to compare against indexed/build
+        side = recommender.side_items['item_name'].iloc[0]
+        stage('incremental', 'update', lambda: recommender.update_item(side, popularity_score=0.5))
+        stage('incremental', 'add_remove', lambda: recommender.add_item(
+            'Bench Side', 'side', 250, 'savory', 0.8).remove_item('Bench Side'))
+
+    # Pruned search never materializes the product, so it runs at every size
+    searcher = MenuRecommender(data)
+    searcher.max_indexed_combos = 0
+    stage('search', 'top_k', lambda: searcher.top_combos(30, CALORIE_RANGE, MIN_POPULARITY))
+    stage('search', 'plan', lambda: searcher.recommend_3_day_menu(CALORIE_RANGE, MIN_POPULARITY))
+    stage('search', 'plan_taste', lambda: generate_flexible_combo(
+        searcher, 'spicy', CALORIE_RANGE, MIN_POPULARITY))
+    return records
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    # Stage-by-stage time ratio against an earlier results file; returns the regressed stages
+    key = lambda r: (r['items_per_category'], r['pipeline'], r['stage'])  # noqa: E731
+    previous = {key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'size':>6} {'pipeline':<12} {'stage':<12} {'before ms':>10} {'after ms':>10} {'ratio':>7}")
+    for record in current['results']:
+        before = previous.get(key(record))
+        if before is None or before['seconds'] == 0:
+            continue
+        ratio = record['seconds'] / before['seconds']
+        flag = '  <-- slower' if ratio > tolerance else ''
+        print(f"{record['items_per_category']:>6} {record['pipeline']:<12} {record['stage']:<12} "
+              f"{before['seconds'] * 1000:>10.2f} {record['seconds'] * 1000:>10.2f} {ratio:>7.2f}{flag}")
+        if ratio > tolerance:
+            regressions.append(key(record))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the recommendation pipeline on synthetic menus.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='items per category')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-materialized', type=int, default=1_000_000,
+                        help='largest product to run the materialized/indexed pipelines on')
+    parser.add_argument('--output', default=str(ROOT / 'benchmarks' / 'results' / 'pipeline.json'))
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='slowdown ratio that counts as a regression')
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        print(f"{n} items per category ({n ** 3:,} combos)", flush=True)
+        results.extend(bench_size(n, args.seed, args.repeat, args.max_materialized))
+
+    report = {'environment': environment(), 'seed': args.seed, 'repeat': args.repeat, 'results': results}
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {len(results)} measurements to {output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than {args.tolerance}x baseline")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CORE_MODULES = ['model', 'menu_recommender', 'combo_engine', 'combo_index', 'engine_cache']
+PLOTTING_MODULES = ['matplotlib', 'seaborn']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {plotting!r} if m in sys.modules]}}))
+"""
+
+
+def measure(runs=5):
+    # Every run is a fresh interpreter so nothing is already sitting in sys.modules
+    probe = PROBE.format(modules=CORE_MODULES, plotting=PLOTTING_MODULES)
+    samples, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        loaded.update(result['loaded'])
+    return statistics.median(samples), sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the cold import time of the recommender core.')
+    parser.add_argument('--budget', type=float, default=1.0, help='median import budget in seconds')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    seconds, loaded = measure(args.runs)
+    print(f"core import: {seconds * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    if loaded:
+        print(f"FAIL: plotting modules imported eagerly: {', '.join(loaded)}")
+        return 1
+    if seconds > args.budget:
+        print("FAIL: import budget exceeded")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
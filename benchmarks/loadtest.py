@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlencode
+
+TASTES = ['spicy', 'savory', 'sweet', '']
+
+
+async def _request(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, deadline, latencies, errors, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            params = {
+                'taste': rng.choice(TASTES),
+                'min_cal': rng.choice([600, 650, 700]),
+                'max_cal': rng.choice([850, 900, 1000]),
+                'min_pop': rng.choice([0.5, 0.6, 0.7, 0.8]),
+            }
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, f"/plan?{urlencode(params)}")
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def _percentile(values, q):
+    # None when no request completed, e.g. the service was down for the whole run
+    if not values:
+        return None
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+
+def _milliseconds(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+async def run(host, port, concurrency, duration, seed):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, deadline, latencies, errors, random.Random(seed + i))
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': _milliseconds(_percentile(latencies, 50)),
+        'p99_ms': _milliseconds(_percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test a running service.py instance.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.host, args.port, args.concurrency, args.duration, args.seed))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{report['requests']} requests in {report['seconds']}s with {report['concurrency']} connections "
+              f"({report['errors']} errors)")
+        print(f"throughput: {report['rps']} req/s")
+        if report['p50_ms'] is None:
+            print("latency: no requests completed")
+        else:
+            print(f"latency p50: {report['p50_ms']} ms  p99: {report['p99_ms']} ms")
+
+
+if __name__ == '__main__':
+    main()
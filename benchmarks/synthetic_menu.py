@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+TASTES = ('spicy', 'savory', 'sweet')
+
+# Per-category calorie distribution (mean, sd, min, max) and taste mix, loosely fitted to the sample menu
+CATEGORY_PROFILES = {
+    'main': {'calories': (500, 90, 250, 900), 'tastes': (0.45, 0.45, 0.10)},
+    'side': {'calories': (230, 80, 50, 450), 'tastes': (0.20, 0.60, 0.20)},
+    'drink': {'calories': (130, 55, 20, 350), 'tastes': (0.15, 0.25, 0.60)},
+}
+
+# Extra courses for the course-schema benchmarks, appended after the three base categories
+EXTRA_PROFILES = {
+    'starter': {'calories': (200, 60, 60, 400), 'tastes': (0.45, 0.40, 0.15)},
+    'dessert': {'calories': (300, 80, 100, 550), 'tastes': (0.05, 0.10, 0.85)},
+}
+
+
+def synthetic_menu(items_per_category, seed=0, tastes=TASTES, extra_courses=()):
+    # Reproducible menu with the same columns as load_menu_data(): calories rounded to 10 kcal,
+    # popularity from a right-skewed beta distribution rounded to two decimals. extra_courses
+    # adds EXTRA_PROFILES categories without changing the base ones.
+    rng = np.random.default_rng(seed)
+    frames = []
+    profiles = dict(CATEGORY_PROFILES, **{category: EXTRA_PROFILES[category] for category in extra_courses})
+    for category, profile in profiles.items():
+        mean, sd, low, high = profile['calories']
+        weights = np.resize(np.asarray(profile['tastes'], dtype=float), len(tastes))
+        frames.append(pd.DataFrame({
+            'item_name': [f"{category.title()} {i:05d}" for i in range(items_per_category)],
+            'category': category,
+            'calories': (np.clip(rng.normal(mean, sd, items_per_category), low, high) / 10).round().astype(int) * 10,
+            'taste_profile': rng.choice(list(tastes), items_per_category, p=weights / weights.sum()),
+            'popularity_score': rng.beta(5, 2, items_per_category).round(2),
+        }))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ['item_name', 'category', 'calories', 'taste_profile', 'popularity_score']
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot'
+EXPORT_SUFFIXES = ('.csv', '.parquet', '.pq')
+
+# Raw little-endian arrays, one file per column; meta.json records dtypes, row count and vocabularies
+SNAPSHOT_ARRAYS = {
+    'calories': '<i4',
+    'popularity_score': '<f8',
+    'category': '<i2',
+    'taste_profile': '<i2',
+    'name_offsets': '<i8',
+    'names': 'u1',
+}
+
+
+def validate_chunk(chunk, first_row=0):
+    # Raises ValueError naming the offending rows; returns the chunk with normalized dtypes
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Menu is missing required columns: {', '.join(missing)}")
+    chunk = chunk[REQUIRED_COLUMNS].copy()
+    empty = chunk.isna().any(axis=1)
+    chunk['calories'] = pd.to_numeric(chunk['calories'], errors='coerce')
+    chunk['popularity_score'] = pd.to_numeric(chunk['popularity_score'], errors='coerce')
+
+    problems = {
+        'empty values': empty,
+        'calories and popularity_score must be numeric': chunk.isna().any(axis=1) & ~empty,
+        'calories must be whole numbers between 0 and 2^31': ~(
+            (chunk['calories'] >= 0) & (chunk['calories'] < 2 ** 31) & (chunk['calories'] % 1 == 0)),
+        'popularity_score must be between 0 and 1': ~chunk['popularity_score'].between(0, 1),
+    }
+    for problem, bad in problems.items():
+        if bad.any():
+            rows = (np.flatnonzero(bad.to_numpy()) + first_row)[:5].tolist()
+            raise ValueError(f"Invalid menu rows {rows}: {problem}")
+
+    chunk['calories'] = chunk['calories'].astype(np.int64)
+    chunk['popularity_score'] = chunk['popularity_score'].astype(np.float64)
+    for column in ('item_name', 'category', 'taste_profile'):
+        chunk[column] = chunk[column].astype(str)
+    return chunk
+
+
+def iter_menu_chunks(path, chunksize=100_000):
+    # Validated DataFrame chunks from a CSV or Parquet export, never holding the whole file
+    path = Path(path)
+    first_row = 0
+    if path.suffix.lower() in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet menus requires pyarrow (pip install pyarrow)") from None
+        parquet = pq.ParquetFile(path)
+        missing = [column for column in REQUIRED_COLUMNS if column not in parquet.schema_arrow.names]
+        if missing:
+            raise ValueError(f"Menu is missing required columns: {', '.join(missing)}")
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunksize, columns=REQUIRED_COLUMNS))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize, skipinitialspace=True)
+
+    for chunk in chunks:
+        yield validate_chunk(chunk, first_row)
+        first_row += len(chunk)
+
+
+def load_menu(path, chunksize=100_000):
+    chunks = list(iter_menu_chunks(path, chunksize))
+    if not chunks:
+        return pd.DataFrame({column: [] for column in REQUIRED_COLUMNS})
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_snapshot(chunks, path, source=None):
+    # Streams validated chunks into raw column files, then swaps the finished directory into place
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    vocab = {'category': {}, 'taste_profile': {}}
+    rows, name_bytes = 0, 0
+    files = {name: open(tmp / f"{name}.bin", 'wb') for name in SNAPSHOT_ARRAYS}
+    completed = False
+    try:
+        files['name_offsets'].write(np.zeros(1, dtype=SNAPSHOT_ARRAYS['name_offsets']).tobytes())
+        for chunk in chunks:
+            files['calories'].write(chunk['calories'].to_numpy().astype(SNAPSHOT_ARRAYS['calories']).tobytes())
+            files['popularity_score'].write(
+                chunk['popularity_score'].to_numpy().astype(SNAPSHOT_ARRAYS['popularity_score']).tobytes())
+            for column, codes in vocab.items():
+                values = [codes.setdefault(value, len(codes)) for value in chunk[column]]
+                files[column].write(np.asarray(values, dtype=SNAPSHOT_ARRAYS[column]).tobytes())
+
+            encoded = [name.encode('utf-8') for name in chunk['item_name']]
+            lengths = np.fromiter((len(name) for name in encoded), dtype=np.int64, count=len(encoded))
+            files['names'].write(b''.join(encoded))
+            offsets = name_bytes + np.cumsum(lengths)
+            files['name_offsets'].write(offsets.astype(SNAPSHOT_ARRAYS['name_offsets']).tobytes())
+            name_bytes = int(offsets[-1]) if len(offsets) else name_bytes
+            rows += len(chunk)
+        completed = True
+    finally:
+        for handle in files.values():
+            handle.close()
+        if not completed:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'rows': rows,
+        'name_bytes': name_bytes,
+        'dtypes': SNAPSHOT_ARRAYS,
+        'category': list(vocab['category']),
+        'taste_profile': list(vocab['taste_profile']),
+        'source': source,
+    }
+    (tmp / 'meta.json').write_text(json.dumps(meta, indent=2))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+
+class MenuSnapshot:
+    # Read-only view of a snapshot directory. Numeric columns and category/taste codes are np.memmap
+    # views of the files, so opening costs no parsing and no copy regardless of catalog size.
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / 'meta.json').read_text())
+        if self.meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported menu snapshot version in {self.path}: {self.meta.get('version')}")
+        self.rows = self.meta['rows']
+        lengths = {'name_offsets': self.rows + 1, 'names': self.meta['name_bytes']}
+        self.arrays = {}
+        for name, dtype in self.meta['dtypes'].items():
+            length = lengths.get(name, self.rows)
+            self.arrays[name] = (np.memmap(self.path / f"{name}.bin", dtype=dtype, mode='r', shape=(length,))
+                                 if length else np.zeros(0, dtype=dtype))
+
+    def __len__(self):
+        return self.rows
+
+    def item_names(self):
+        blob = self.arrays['names'].tobytes()
+        offsets = self.arrays['name_offsets']
+        return np.array([blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.rows)], dtype=object)
+
+    def frame(self):
+        # Only the item names are decoded; every other column wraps the mapped arrays without copying
+        return pd.DataFrame({
+            'item_name': self.item_names(),
+            'category': pd.Categorical.from_codes(self.arrays['category'], self.meta['category']),
+            'calories': self.arrays['calories'],
+            'taste_profile': pd.Categorical.from_codes(self.arrays['taste_profile'], self.meta['taste_profile']),
+            'popularity_score': self.arrays['popularity_score'],
+        }, copy=False)
+
+
+def open_snapshot(path):
+    return MenuSnapshot(path)
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'path': str(Path(path).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def snapshot_path(path):
+    path = Path(path)
+    return path.with_name(path.name + SNAPSHOT_SUFFIX)
+
+
+def load_catalog(path, chunksize=100_000, rebuild=False):
+    # Opens a snapshot directory directly. For a CSV/Parquet export, reuses the snapshot next to it
+    # while the export is unchanged (same size and mtime), otherwise ingests it and writes a fresh one.
+    path = Path(path)
+    if path.is_dir():
+        return open_snapshot(path)
+    snapshot = snapshot_path(path)
+    stamp = _source_stamp(path)
+    if not rebuild and (snapshot / 'meta.json').exists():
+        current = open_snapshot(snapshot)
+        if current.meta.get('source') == stamp:
+            return current
+    write_snapshot(iter_menu_chunks(path, chunksize), snapshot, source=stamp)
+    return open_snapshot(snapshot)
+
+
+def load_menu_frame(path):
+    return load_catalog(path).frame()
+
+
+def menu_hash(data):
+    # Content hash of the menu: identical menus share an engine, any edit gives a new key
+    rows = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    digest = hashlib.sha1(','.join(map(str, data.columns)).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+class MenuDirectory:
+    # One menu per restaurant: <id>.csv / <id>.parquet exports (snapshots are cached beside them
+    # as usual) or prebuilt <id>.snapshot directories. Calling it loads a restaurant's menu frame.
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def restaurants(self):
+        ids = set()
+        for path in self.directory.iterdir():
+            if path.is_file() and path.suffix.lower() in EXPORT_SUFFIXES:
+                ids.add(path.stem)
+            elif path.is_dir() and path.suffix == SNAPSHOT_SUFFIX:
+                # <id>.csv.snapshot belongs to the export, already listed
+                if Path(path.stem).suffix.lower() not in EXPORT_SUFFIXES:
+                    ids.add(path.stem)
+        return sorted(ids)
+
+    def path(self, restaurant_id):
+        if not re.fullmatch(r'[\w-]+', str(restaurant_id)):
+            raise ValueError(f"Invalid restaurant id: {restaurant_id!r}")
+        for suffix in EXPORT_SUFFIXES + (SNAPSHOT_SUFFIX,):
+            path = self.directory / f"{restaurant_id}{suffix}"
+            if path.exists():
+                return path
+        raise ValueError(f"Unknown restaurant: {restaurant_id!r}")
+
+    def __call__(self, restaurant_id):
+        return load_menu_frame(self.path(restaurant_id))
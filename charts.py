@@ -0,0 +1,176 @@
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+CATEGORY_COLORS = {'main': 'red', 'side': 'blue', 'drink': 'green'}
+# Items drawn in the calories vs popularity scatter; larger menus are sampled per category
+MAX_SCATTER_POINTS = 5000
+
+
+def analysis_stats(data, max_points=MAX_SCATTER_POINTS, seed=0):
+    # Everything plot_analysis draws, aggregated in one pass over the menu: mean calories per
+    # category, the popularity histogram, taste counts and a scatter sample of at most
+    # max_points items, stratified by category so small categories keep their share
+    popularity = data['popularity_score'].to_numpy(dtype=np.float64)
+    counts, edges = np.histogram(popularity, bins=10)
+    cat_calories = data.groupby('category', observed=True)['calories'].mean()
+    taste_counts = data['taste_profile'].value_counts()
+
+    rng = np.random.default_rng(seed)
+    categories = data['category'].to_numpy()
+    calories = data['calories'].to_numpy()
+    fraction = min(1.0, max_points / max(len(data), 1))
+    scatter = []
+    for category in data['category'].unique():
+        rows = np.flatnonzero(categories == category)
+        if fraction < 1.0:
+            rows = np.sort(rng.choice(rows, max(1, int(len(rows) * fraction)), replace=False))
+        scatter.append((category, calories[rows], popularity[rows]))
+    return {
+        'cat_calories': cat_calories, 'hist': (counts, edges), 'taste_counts': taste_counts,
+        'scatter': scatter, 'n_items': len(data), 'n_plotted': sum(len(x) for _, x, _ in scatter),
+    }
+
+
+def draw_analysis(fig, stats):
+    axes = fig.subplots(2, 2)
+    fig.suptitle('Menu Dataset Analysis', fontsize=16, fontweight='bold')
+
+    cat_calories = stats['cat_calories']
+    axes[0, 0].bar(cat_calories.index, cat_calories.values, color=['skyblue', 'lightgreen', 'lightcoral'])
+    axes[0, 0].set_title('Average Calories by Category')
+    axes[0, 0].set_ylabel('Calories')
+
+    counts, edges = stats['hist']
+    axes[0, 1].hist(edges[:-1], bins=edges, weights=counts, color='gold', alpha=0.7)
+    axes[0, 1].set_title('Popularity Score Distribution')
+    axes[0, 1].set_xlabel('Popularity Score')
+    axes[0, 1].set_ylabel('Frequency')
+
+    taste_counts = stats['taste_counts']
+    axes[1, 0].bar(taste_counts.index, taste_counts.values, color=['orange', 'purple', 'green'])
+    axes[1, 0].set_title('Taste Profile Distribution')
+    axes[1, 0].set_ylabel('Count')
+
+    for category, calories, popularity in stats['scatter']:
+        axes[1, 1].scatter(calories, popularity, c=CATEGORY_COLORS.get(category, 'gray'), label=category,
+                           alpha=0.7, s=60 if stats['n_plotted'] <= 500 else 8)
+    title = 'Calories vs Popularity by Category'
+    if stats['n_plotted'] < stats['n_items']:
+        title += f" ({stats['n_plotted']:,} of {stats['n_items']:,} items)"
+    axes[1, 1].set_title(title)
+    axes[1, 1].set_xlabel('Calories')
+    axes[1, 1].set_ylabel('Popularity Score')
+    axes[1, 1].legend()
+
+
+def draw_recommendations(fig, recommendations_df):
+    axes = fig.subplots(1, 3)
+    fig.suptitle(f'{len(recommendations_df)}-Day Menu Analysis', fontsize=16, fontweight='bold')
+
+    days = [f'Day {i+1}' for i in range(len(recommendations_df))]
+
+    axes[0].bar(days, recommendations_df['total_calories'], color='lightblue')
+    axes[0].set_title('Daily Calories')
+    axes[0].set_ylabel('Calories')
+    for i, v in enumerate(recommendations_df['total_calories']):
+        axes[0].text(i, v + 10, str(int(v)), ha='center', va='bottom')
+
+    axes[1].bar(days, recommendations_df['avg_popularity'], color='lightgreen')
+    axes[1].set_title('Daily Average Popularity')
+    axes[1].set_ylabel('Popularity Score')
+    for i, v in enumerate(recommendations_df['avg_popularity']):
+        axes[1].text(i, v + 0.01, f'{v:.2f}', ha='center', va='bottom')
+
+    axes[2].bar(days, recommendations_df['taste_diversity'], color='lightcoral')
+    axes[2].set_title('Daily Taste Diversity')
+    axes[2].set_ylabel('Number of Different Tastes')
+    for i, v in enumerate(recommendations_df['taste_diversity']):
+        axes[2].text(i, v + 0.05, str(int(v)), ha='center', va='bottom')
+
+
+def render(draw, *args, figsize=(15, 10), fmt='png', dpi=80):
+    # Draws on a standalone Figure (no pyplot, no GUI backend) and returns the encoded image
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    draw(fig, *args)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
+
+
+def render_analysis(data, fmt='png', max_points=MAX_SCATTER_POINTS):
+    return render(draw_analysis, analysis_stats(data, max_points), figsize=(15, 10), fmt=fmt)
+
+
+def render_recommendations(recommendations_df, fmt='png'):
+    return render(draw_recommendations, recommendations_df, figsize=(15, 5), fmt=fmt)
+
+
+class ChartCache:
+    # Rendered chart bytes keyed by chart, menu hash, recommendation set and format, least
+    # recently used first out. Renders run on a single background thread: matplotlib is not
+    # thread-safe, and one renderer keeps request threads free. A chart already being rendered
+    # is not rendered twice; every caller gets the same Future.
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._charts = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, key, render_chart):
+        with self._lock:
+            if key in self._charts:
+                self.hits += 1
+                self._charts.move_to_end(key)
+                future = Future()
+                future.set_result(self._charts[key])
+                return future
+            if key in self._pending:
+                self.hits += 1
+                return self._pending[key]
+            self.misses += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix='chart-render')
+            future = self._pending[key] = self._executor.submit(render_chart)
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def get(self, key, render_chart):
+        return self.submit(key, render_chart).result()
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._charts[key] = future.result()
+                while len(self._charts) > self.max_size:
+                    self._charts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._charts.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._charts), 'pending': len(self._pending), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses,
+                    'bytes': sum(len(chart) for chart in self._charts.values())}
+
+
+# Shared by every recommender in the process
+chart_cache = ChartCache()
+
+
+def recommendation_key(recommendations):
+    # The plotted combos, by their items; with the menu hash this fixes every plotted value
+    rows = recommendations.iterrows() if hasattr(recommendations, 'iterrows') else enumerate(recommendations)
+    return tuple((row['main'], row['side'], row['drink']) for _, row in rows)
@@ -0,0 +1,129 @@
+import heapq
+
+import numpy as np
+
+from scoring import DEFAULT_SCORING
+
+CATEGORIES = ('main', 'side', 'drink')
+
+COMBO_COLUMNS = [
+    'main', 'main_taste', 'main_calories', 'main_popularity',
+    'side', 'side_taste', 'side_calories', 'side_popularity',
+    'drink', 'drink_taste', 'drink_calories', 'drink_popularity',
+    'total_calories', 'avg_popularity', 'taste_diversity', 'combo_score'
+]
+
+
+def combo_features(calories, popularity, tastes):
+    # Same operation order as MenuRecommender.calculate_combo_score so results match bit for bit
+    total_calories = calories[0] + calories[1] + calories[2]
+    avg_popularity = (popularity[0] + popularity[1] + popularity[2]) / 3
+    taste_diversity = (1 + (tastes[1] != tastes[0]).astype(np.int64)
+                       + ((tastes[2] != tastes[0]) & (tastes[2] != tastes[1])).astype(np.int64))
+    return total_calories, avg_popularity, taste_diversity
+
+
+def score_arrays(calories, popularity, tastes, scoring=DEFAULT_SCORING):
+    total_calories, avg_popularity, taste_diversity = combo_features(calories, popularity, tastes)
+    return total_calories, avg_popularity, taste_diversity, scoring.score(total_calories, avg_popularity,
+                                                                          taste_diversity)
+
+
+def top_combos(items, k, calorie_range=None, min_popularity=None, allowed=None, block_size=65536, deadline=None):
+    positions, _ = top_positions(items, k, calorie_range, min_popularity, allowed, block_size, deadline)
+    return items.frame(np.unravel_index(positions, items.sizes), index=positions)
+
+
+def top_positions(items, k, calorie_range=None, min_popularity=None, allowed=None, block_size=65536,
+                  deadline=None):
+    # Best-first search over mains and sides sorted by popularity. Only blocks whose score
+    # upper bound can still enter the current top k are scored, so memory is O(block_size + k).
+    # allowed optionally restricts each category to a boolean mask of usable items. Returns the
+    # generate_all_combos positions and scores of the top k, best first (ties by position).
+    # With a Deadline the search is anytime: past the deadline it stops at the next block once
+    # it holds k combos, reporting the current main's bound as the best it may have missed.
+    sizes = items.sizes
+    if allowed is None:
+        allowed = [np.ones(size, dtype=bool) for size in sizes]
+    usable = [np.flatnonzero(mask) for mask in allowed]
+    if k <= 0 or any(len(idx) == 0 for idx in usable):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    scoring = items.scoring
+    codes = items.taste_codes
+    cal = [items.calories[axis].astype(items.calorie_dtype) for axis in range(3)]
+    pop = items.popularity
+    lo, hi = calorie_range if calorie_range is not None else (-np.inf, np.inf)
+    floor = min_popularity if min_popularity is not None else -np.inf
+    n_sides, n_drinks = sizes[1], sizes[2]
+
+    # Bounds carry a small slack so float rounding never prunes a valid combo
+    slack = 1e-9
+    main_order = usable[0][np.argsort(-pop[0][usable[0]], kind='stable')]
+    side_order = usable[1][np.argsort(-pop[1][usable[1]], kind='stable')]
+    drinks = usable[2]
+    side_cal, side_pop = cal[1][side_order], pop[1][side_order]
+    drink_cal, drink_pop, drink_codes = cal[2][drinks], pop[2][drinks], codes[2][drinks]
+    max_side_pop, max_drink_pop = side_pop.max(), drink_pop.max()
+    min_side_cal, max_side_cal = side_cal.min(), side_cal.max()
+    min_drink_cal, max_drink_cal = drink_cal.min(), drink_cal.max()
+    cal_low = max(lo, cal[0][usable[0]].min() + min_side_cal + min_drink_cal)
+    cal_high = min(hi, cal[0][usable[0]].max() + max_side_cal + max_drink_cal)
+    cal_bound = scoring.calorie_bound(cal_low, cal_high) if cal_low <= cal_high else -np.inf
+    rows_per_block = max(1, block_size // len(drinks))
+
+    heap = []
+    interrupted = False
+    for i in main_order:
+        bound_pop = pop[0][i] + max_side_pop + max_drink_pop
+        main_bound = scoring.popularity_bound(bound_pop) + cal_bound
+        threshold = heap[0][0] if len(heap) == k else -np.inf
+        if bound_pop / 3 < floor - slack or main_bound < threshold - slack:
+            break
+        if cal[0][i] + min_side_cal + min_drink_cal > hi or cal[0][i] + max_side_cal + max_drink_cal < lo:
+            continue
+
+        pair_cal = cal[0][i] + side_cal
+        pair_pop = pop[0][i] + side_pop
+        feasible = ((pair_cal + min_drink_cal <= hi) & (pair_cal + max_drink_cal >= lo)
+                    & ((pair_pop + max_drink_pop) / 3 >= floor - slack))
+        candidates = side_order[feasible]
+        bound_pop = pair_pop[feasible] + max_drink_pop
+        candidate_bounds = scoring.popularity_bound(bound_pop) + cal_bound
+
+        for start in range(0, len(candidates), rows_per_block):
+            threshold = heap[0][0] if len(heap) == k else -np.inf
+            if candidate_bounds[start] < threshold - slack:
+                break
+            if deadline is not None and len(heap) == k and deadline.expired():
+                # Later mains bound no higher than this one, whose remaining blocks are unscored
+                deadline.interrupt(main_bound, threshold)
+                interrupted = True
+                break
+            j = candidates[start:start + rows_per_block][:, None]
+            total_calories, avg_popularity, _, combo_score = score_arrays(
+                (cal[0][i], cal[1][j], drink_cal[None, :]),
+                (pop[0][i], pop[1][j], drink_pop[None, :]),
+                (codes[0][i], codes[1][j], drink_codes[None, :]), scoring)
+            keep = ((total_calories >= lo) & (total_calories <= hi)
+                    & (avg_popularity >= floor) & (combo_score >= threshold))
+            rows, cols = np.nonzero(keep)
+            if len(rows) == 0:
+                continue
+            positions = (i * n_sides + j[rows, 0]) * n_drinks + drinks[cols]
+            scores = combo_score[rows, cols]
+            order = np.lexsort((positions, -scores))[:k]
+            for score, position in zip(scores[order].tolist(), positions[order].tolist()):
+                entry = (score, -position)
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+                else:
+                    break
+        if interrupted:
+            break
+
+    ranked = sorted(heap, reverse=True)
+    positions = np.array([-position for _, position in ranked], dtype=np.int64)
+    return positions, np.array([score for score, _ in ranked], dtype=np.float64)
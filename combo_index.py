@@ -0,0 +1,208 @@
+import numpy as np
+
+from combo_store import compact_calories
+
+
+def _position_dtype(n):
+    return np.int32 if n <= np.iinfo(np.int32).max else np.int64
+
+
+def _merge_points(n, keys, new_keys, lo=None, hi=None, step=64):
+    # Insertion points that keep n lexicographically sorted rows sorted when the rows of new_keys
+    # are inserted: a binary search run for all new rows at once. keys are functions returning
+    # the two key columns (primary, then position) at the probed rows, so only probed rows are
+    # ever gathered.
+    # lo and hi, when given, narrow each new row's search to the rows [lo, hi). Long ranges are
+    # first cut down to step rows by one searchsorted over every step-th row, with both key
+    # columns packed into a complex number (numpy orders complex values lexicographically).
+    lo = np.zeros(len(new_keys[0]), dtype=np.int64) if lo is None else lo.astype(np.int64)
+    hi = np.full(len(new_keys[0]), n, dtype=np.int64) if hi is None else hi.astype(np.int64)
+    long = np.flatnonzero(hi - lo > 16 * step)
+    if len(long):
+        code = lo[long] * (n + 1) + hi[long]
+        order = np.argsort(code, kind='stable')
+        bounds = np.flatnonzero(np.diff(code[order])) + 1
+        for members in np.split(long[order], bounds):
+            start, stop = lo[members[0]], hi[members[0]]
+            sampled = np.arange(start, stop, step)
+            sampled = keys[0](sampled) + 1j * keys[1](sampled)
+            found = np.searchsorted(sampled, new_keys[0][members] + 1j * new_keys[1][members])
+            lo[members] = np.maximum(start, start + (found - 1) * step + 1)
+            hi[members] = np.minimum(stop, start + found * step)
+    return _search(n, keys, new_keys, lo, hi)
+
+
+def _search(n, keys, new_keys, lo, hi):
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+        mid = (lo + hi) // 2
+        probe = np.minimum(mid, n - 1)
+        less = np.zeros(len(lo), dtype=bool)
+        equal = np.ones(len(lo), dtype=bool)
+        for existing, new in zip(keys, new_keys):
+            values = existing(probe)
+            less |= equal & (values < new)
+            equal &= values == new
+        lo = np.where(active & less, mid + 1, lo)
+        hi = np.where(active & ~less, mid, hi)
+
+
+class ComboIndex:
+    # Combos grouped into popularity buckets, each bucket sorted by total_calories. A range query
+    # binary-searches every bucket above the popularity floor and only checks the floor inside
+    # the single boundary bucket, so finding the m matches costs O(log n + m). Best-first results
+    # come from scanning the precomputed combo_score order until enough matches turn up.
+    def __init__(self, store, bucket_width=0.05):
+        self.store = store
+        self.bucket_width = bucket_width
+        n = len(store)
+        dtype = _position_dtype(n)
+        calories, popularity, _ = store.features()
+        self.rerank()
+
+        buckets = self._bucket(popularity)
+        order = np.lexsort((calories, buckets))
+        self.rows = order.astype(dtype)
+        self.calories = compact_calories(calories[order])
+        self.bucket_keys, starts = np.unique(buckets[order], return_index=True)
+        self.bucket_starts = np.append(starts, n)
+
+    def __len__(self):
+        return len(self.store)
+
+    def rerank(self):
+        # Best score first, ties in generate_all_combos row order. The buckets do not depend on
+        # combo_score, so this is all a change of scoring weights needs.
+        n = len(self.store)
+        dtype = _position_dtype(n)
+        self.ranked = np.lexsort((np.arange(n), -self.store.combo_score)).astype(dtype)
+        self.rank = np.empty(n, dtype=dtype)
+        self.rank[self.ranked] = np.arange(n, dtype=dtype)
+
+    @property
+    def nbytes(self):
+        return self.ranked.nbytes + self.rank.nbytes + self.rows.nbytes + self.calories.nbytes
+
+    def _bucket(self, popularity):
+        return np.floor(np.asarray(popularity) / self.bucket_width).astype(np.int64)
+
+    def query(self, calorie_range=None, min_popularity=None, k=None):
+        # Positions of matching combos, best combo_score first; with k, only the first k
+        matches = self.match(calorie_range, min_popularity)
+        if k is None:
+            return self.order(matches)
+        return self.first(matches, k)
+
+    def match(self, calorie_range=None, min_popularity=None):
+        # Positions of matching combos, in bucket order
+        lo, hi = calorie_range if calorie_range is not None else (-np.inf, np.inf)
+        first = 0
+        boundary = None
+        if min_popularity is not None:
+            boundary = int(self._bucket(min_popularity))
+            first = np.searchsorted(self.bucket_keys, boundary)
+
+        hits = []
+        for b in range(first, len(self.bucket_keys)):
+            start, end = self.bucket_starts[b], self.bucket_starts[b + 1]
+            left = start + np.searchsorted(self.calories[start:end], lo, side='left')
+            right = start + np.searchsorted(self.calories[start:end], hi, side='right')
+            rows = self.rows[left:right]
+            if self.bucket_keys[b] == boundary:
+                rows = rows[self.store.avg_popularity(rows) >= min_popularity]
+            hits.append(rows)
+
+        if not hits:
+            return np.zeros(0, dtype=self.rows.dtype)
+        return np.concatenate(hits)
+
+    def order(self, positions):
+        return self.ranked[np.sort(self.rank[positions])]
+
+    def first(self, positions, k):
+        # The first k of positions in ranked order. A partial selection over their ranks: O(m) for
+        # m positions, with nothing sized to the whole index
+        ranks = self.rank[positions]
+        if k <= 0:
+            return np.zeros(0, dtype=self.ranked.dtype)
+        if k < len(ranks):
+            ranks = np.partition(ranks, k - 1)[:k]
+        return self.ranked[np.sort(ranks)]
+
+    def patch(self, stale, remap, fresh):
+        # Brings the index up to date with a ComboStore edit without re-sorting. The stale
+        # positions drop out, the rest are renumbered (monotone, so both orders survive) and the
+        # fresh positions are binary-searched into the ranked order and into their own bucket.
+        # When positions did not move, rank is only rewritten over the range of ranks between
+        # the first and last combo that moved. The result equals a ComboIndex built from scratch
+        # on the edited store.
+        n = len(self.store)
+        dtype = _position_dtype(n)
+        stale = np.asarray(stale, dtype=np.int64)
+        fresh = np.asarray(fresh, dtype=np.int64)
+        fresh_calories, fresh_popularity, _, fresh_score = self.store.items.features(self.store.triples(fresh))
+        self._patch_buckets(stale, remap, fresh, fresh_calories, fresh_popularity, dtype)
+        self._patch_ranked(stale, remap, fresh, fresh_score, n, dtype)
+        return self
+
+    def _patch_ranked(self, stale, remap, fresh, fresh_score, n, dtype):
+        stale_ranks = np.sort(self.rank[stale])
+        ranked = np.delete(self.ranked, stale_ranks)
+        if remap is not None:
+            ranked = remap(ranked)
+        order = np.lexsort((fresh, -fresh_score))
+        fresh = fresh[order]
+        points = _merge_points(len(ranked), (lambda m: -self.store.combo_score[ranked[m]], lambda m: ranked[m]),
+                               (-fresh_score[order], fresh))
+        self.ranked = np.insert(ranked, points, fresh).astype(dtype, copy=False)
+        if remap is None and len(self.rank) == n:
+            # Ranks below the first change and above the last one are where they were
+            moved = np.concatenate((stale_ranks, points + np.arange(len(points))))
+            if len(moved):
+                low, high = moved.min(), moved.max() + 1
+                self.rank = self.rank.copy()
+                self.rank[self.ranked[low:high].astype(np.intp)] = np.arange(low, high, dtype=dtype)
+            return
+        self.rank = np.empty(n, dtype=dtype)
+        self.rank[self.ranked.astype(np.intp)] = np.arange(n, dtype=dtype)
+
+    def _patch_buckets(self, stale, remap, fresh, fresh_calories, fresh_popularity, dtype):
+        # Bucket sizes are adjusted by what left and joined each bucket; entries of one bucket only
+        # ever move within it, so a fresh entry is searched for within its bucket's rows alone
+        dropped = np.zeros(len(self.rank), dtype=bool)
+        dropped[stale] = True
+        gone = np.flatnonzero(dropped[self.rows])
+        rows, calories = np.delete(self.rows, gone), np.delete(self.calories, gone)
+        if remap is not None:
+            rows = remap(rows)
+        counts = np.diff(self.bucket_starts)
+        counts -= np.bincount(np.searchsorted(self.bucket_starts, gone, side='right') - 1,
+                              minlength=len(counts)).astype(counts.dtype)
+
+        fresh_buckets = self._bucket(fresh_popularity)
+        order = np.lexsort((fresh, fresh_calories, fresh_buckets))
+        fresh, fresh_calories, fresh_buckets = fresh[order], fresh_calories[order], fresh_buckets[order]
+        keys = np.union1d(self.bucket_keys, fresh_buckets)
+        kept = np.zeros(len(keys), dtype=np.int64)
+        kept[np.searchsorted(keys, self.bucket_keys)] = counts
+        starts = np.concatenate(([0], np.cumsum(kept)))
+        b = np.searchsorted(keys, fresh_buckets)
+        points = _merge_points(len(rows), (calories.__getitem__, rows.__getitem__), (fresh_calories, fresh),
+                               lo=starts[b], hi=starts[b + 1])
+        self.rows = np.insert(rows, points, fresh).astype(dtype, copy=False)
+        if len(fresh):
+            # Widened only when a fresh total does not fit; compact_calories narrows back if it can
+            calories = np.insert(calories.astype(np.result_type(calories, compact_calories(fresh_calories)),
+                                                 copy=False), points, fresh_calories)
+        self.calories = compact_calories(calories)
+        sizes = kept + np.bincount(b, minlength=len(keys))
+        self.bucket_keys = keys[sizes > 0]
+        self.bucket_starts = np.concatenate(([0], np.cumsum(sizes[sizes > 0])))
+
+    def top(self, k):
+        return self.take(self.ranked[:k])
+
+    def take(self, positions):
+        return self.store.frame(positions)
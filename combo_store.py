@@ -0,0 +1,241 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from combo_engine import CATEGORIES, COMBO_COLUMNS, score_arrays
+from scoring import DEFAULT_SCORING
+
+
+def _smallest_int(max_value, candidates=(np.int8, np.int16, np.int32, np.int64)):
+    for dtype in candidates:
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def compact_calories(calories):
+    # int16 when every value fits, otherwise the narrowest integer type; non-integer data is left as is
+    if not np.issubdtype(calories.dtype, np.integer) or len(calories) == 0:
+        return calories
+    low, high = calories.min(), calories.max()
+    for dtype in (np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return calories.astype(dtype, copy=False)
+    return calories
+
+
+class ItemStore:
+    # Each menu item held once, per category, in typed arrays: compact integer calories, taste and
+    # name codes shared across categories, float64 popularity (kept at full precision so combo
+    # scores stay bit-identical to scoring the DataFrame directly)
+    def __init__(self, main_items, side_items, drink_items, scoring=DEFAULT_SCORING):
+        frames = (main_items, side_items, drink_items)
+        self.scoring = scoring
+        self.sizes = tuple(len(items) for items in frames)
+        self.calorie_dtype = np.result_type(*[items['calories'].dtype for items in frames])
+        self.names = [items['item_name'].to_numpy() for items in frames]
+        self.calories = [compact_calories(items['calories'].to_numpy()) for items in frames]
+        self.popularity = [items['popularity_score'].to_numpy().astype(np.float64) for items in frames]
+
+        taste_codes, self.tastes = pd.factorize(pd.concat([items['taste_profile'] for items in frames],
+                                                          ignore_index=True))
+        name_codes, item_names = pd.factorize(pd.concat([items['item_name'] for items in frames],
+                                                        ignore_index=True))
+        self.n_names = len(item_names)
+        taste_dtype = _smallest_int(max(len(self.tastes) - 1, 0))
+        name_dtype = _smallest_int(max(self.n_names - 1, 0), (np.int16, np.int32, np.int64))
+        bounds = np.cumsum((0,) + self.sizes)
+        self.taste_codes = [taste_codes[bounds[c]:bounds[c + 1]].astype(taste_dtype) for c in range(3)]
+        self.name_codes = [name_codes[bounds[c]:bounds[c + 1]].astype(name_dtype) for c in range(3)]
+
+    def without_labels(self):
+        # Shallow copy without item names and taste labels: all that scoring needs, and cheap to
+        # send to worker processes
+        scoring = copy.copy(self)
+        scoring.names = None
+        scoring.tastes = None
+        return scoring
+
+    @property
+    def nbytes(self):
+        arrays = self.calories + self.popularity + self.taste_codes + self.name_codes
+        return sum(array.nbytes for array in arrays)
+
+    @property
+    def n_combos(self):
+        return int(np.prod(self.sizes))
+
+    def index_dtype(self, axis):
+        return _smallest_int(max(self.sizes[axis] - 1, 0), (np.int16, np.int32, np.int64))
+
+    def calories_of(self, axis, idx):
+        return self.calories[axis][idx].astype(self.calorie_dtype)
+
+    def features(self, idx):
+        calories = [self.calories_of(axis, idx[axis]) for axis in range(3)]
+        popularity = [self.popularity[axis][idx[axis]] for axis in range(3)]
+        tastes = [self.taste_codes[axis][idx[axis]] for axis in range(3)]
+        return score_arrays(calories, popularity, tastes, self.scoring)
+
+    def frame(self, idx, scores=None, index=None):
+        # Materialize names and tastes for the given (main, side, drink) index triples only
+        columns = {}
+        for axis, category in enumerate(CATEGORIES):
+            pick = idx[axis]
+            columns[category] = self.names[axis][pick]
+            columns[f'{category}_taste'] = np.asarray(self.tastes)[self.taste_codes[axis][pick]]
+            columns[f'{category}_calories'] = self.calories_of(axis, pick)
+            columns[f'{category}_popularity'] = self.popularity[axis][pick]
+        if scores is None:
+            scores = self.features(idx)
+        for name, values in zip(COMBO_COLUMNS[-4:], scores):
+            columns[name] = values
+        return pd.DataFrame(columns, columns=COMBO_COLUMNS, index=index)
+
+
+def _grid(values, axis):
+    shape = [1, 1, 1]
+    shape[axis] = len(values)
+    return np.asarray(values).reshape(shape)
+
+
+def score_grid(items, picks):
+    # combo_score of every combination of the picked items, shaped (len(picks[0]), len(picks[1]), len(picks[2]))
+    calories = [_grid(items.calories_of(axis, pick), axis) for axis, pick in enumerate(picks)]
+    popularity = [_grid(items.popularity[axis][pick], axis) for axis, pick in enumerate(picks)]
+    tastes = [_grid(items.taste_codes[axis][pick], axis) for axis, pick in enumerate(picks)]
+    return np.broadcast_to(score_arrays(calories, popularity, tastes, items.scoring)[3],
+                           tuple(len(pick) for pick in picks))
+
+
+def index_grid(items):
+    return [np.broadcast_to(_grid(np.arange(size, dtype=items.index_dtype(axis)), axis), items.sizes).reshape(-1)
+            for axis, size in enumerate(items.sizes)]
+
+
+def _slab(sizes, axis, item):
+    # Picks and slice selecting every combo that contains item `item` of category `axis`
+    picks = [np.arange(size) for size in sizes]
+    picks[axis] = np.array([item])
+    where = [slice(None)] * 3
+    where[axis] = slice(item, item + 1)
+    return picks, tuple(where)
+
+
+def combo_positions(sizes, axis, item):
+    # generate_all_combos positions of every combo containing item `item` of category `axis`
+    picks, _ = _slab(sizes, axis, item)
+    return np.ravel_multi_index(np.ix_(*picks), sizes).reshape(-1)
+
+
+def position_remap(old_sizes, new_sizes, axis, removed=None):
+    # Maps positions of surviving combos to their positions after the category sizes changed.
+    # Item order is preserved, so the mapping is monotone and sorted position lists stay sorted.
+    # A position is (outer * size + item) * inner + rest around `axis`, and only outer and item
+    # shift. Plain integer arithmetic, kept in the positions' own dtype while the new ones fit.
+    inner = int(np.prod(old_sizes[axis + 1:], dtype=np.int64))
+    size, shift = old_sizes[axis], new_sizes[axis] - old_sizes[axis]
+    fits = int(np.prod(new_sizes, dtype=np.int64)) <= np.iinfo(np.int32).max
+
+    def remap(positions):
+        positions = np.asarray(positions)
+        if positions.dtype != np.int32 or not fits:
+            positions = positions.astype(np.int64)
+        scalar = positions.dtype.type
+        slab = positions // scalar(inner)
+        outer = slab // scalar(size)
+        moved = positions + outer * scalar(shift * inner)
+        if removed is not None:
+            moved -= (slab - outer * scalar(size) > removed) * scalar(inner)
+        return moved
+    return remap
+
+
+class ComboStore:
+    # Combos as (main, side, drink) index triples plus combo_score. total_calories, avg_popularity
+    # and taste_diversity are cheap gathers from the ItemStore and are derived on demand; features()
+    # keeps them in compact arrays once something (the index, a rescore) needs all of them.
+    def __init__(self, items, idx, combo_score):
+        self.items = items
+        self.idx = idx
+        self.combo_score = combo_score
+        self._features = None
+
+    @classmethod
+    def build(cls, items):
+        # Every combo, in the main -> side -> drink order of the original nested loops
+        combo_score = np.empty(items.sizes)
+        combo_score[...] = score_grid(items, [np.arange(size) for size in items.sizes])
+        return cls(items, index_grid(items), combo_score.reshape(-1))
+
+    def features(self):
+        # (total_calories, avg_popularity, taste_diversity) of every combo. None of them depend on
+        # the scoring weights, so they are computed once and reused by every rescore.
+        if self._features is None:
+            total_calories, avg_popularity, taste_diversity, _ = self.items.features(self.triples())
+            self._features = (compact_calories(total_calories), avg_popularity, taste_diversity.astype(np.int8))
+        return self._features
+
+    def rescore_all(self):
+        # The items' scoring spec changed: a vectorized rescore of the cached features, no product
+        total_calories, avg_popularity, taste_diversity = self.features()
+        self.combo_score = self.items.scoring.score(total_calories.astype(self.items.calorie_dtype),
+                                                    avg_popularity, taste_diversity)
+
+    # The edits below take the ItemStore rebuilt from the edited menu and rescore only the combos
+    # that contain the edited item. Each returns (stale, remap, fresh) for ComboIndex.patch: old
+    # positions whose entries are gone, the old -> new position mapping (None when unchanged),
+    # and new positions that need (re)inserting.
+
+    def rescore(self, items, axis, item):
+        # An item's calories or popularity changed in place
+        picks, where = _slab(items.sizes, axis, item)
+        self.items, self._features = items, None
+        self.combo_score.reshape(items.sizes)[where] = score_grid(items, picks)
+        positions = combo_positions(items.sizes, axis, item)
+        return positions, None, positions
+
+    def insert(self, items, axis):
+        # A new item was appended to category `axis`
+        old_sizes = self.items.sizes
+        picks, _ = _slab(items.sizes, axis, items.sizes[axis] - 1)
+        scores = np.concatenate([self.combo_score.reshape(old_sizes), score_grid(items, picks)], axis=axis)
+        self.items, self.idx, self.combo_score = items, index_grid(items), scores.reshape(-1)
+        self._features = None
+        return (np.zeros(0, dtype=np.int64), position_remap(old_sizes, items.sizes, axis),
+                combo_positions(items.sizes, axis, items.sizes[axis] - 1))
+
+    def remove(self, items, axis, item):
+        # Item `item` of category `axis` was removed
+        old_sizes = self.items.sizes
+        scores = np.delete(self.combo_score.reshape(old_sizes), item, axis=axis)
+        self.items, self.idx, self.combo_score = items, index_grid(items), scores.reshape(-1)
+        self._features = None
+        return (combo_positions(old_sizes, axis, item), position_remap(old_sizes, items.sizes, axis, item),
+                np.zeros(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.combo_score)
+
+    def triples(self, rows=None):
+        return [ids if rows is None else ids[rows] for ids in self.idx]
+
+    def total_calories(self, rows=None):
+        return self.items.features(self.triples(rows))[0]
+
+    def avg_popularity(self, rows=None):
+        return self.items.features(self.triples(rows))[1]
+
+    def taste_diversity(self, rows=None):
+        return self.items.features(self.triples(rows))[2]
+
+    def frame(self, rows=None):
+        if rows is None:
+            rows = np.arange(len(self))
+        return self.items.frame(self.triples(rows), index=rows)
+
+    @property
+    def nbytes(self):
+        features = sum(array.nbytes for array in self._features) if self._features is not None else 0
+        return sum(ids.nbytes for ids in self.idx) + self.combo_score.nbytes + features
@@ -0,0 +1,329 @@
+import copy
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from scoring import DEFAULT_SCORING
+
+
+class CourseSchema:
+    # Ordered courses of a meal, each a menu category; optional courses may be left out. As a
+    # string, categories are comma separated and a trailing ? marks an optional one:
+    # 'starter?,main,side,drink,dessert?'.
+    def __init__(self, courses, optional=()):
+        self.courses = tuple(courses)
+        self.optional = tuple(course in optional for course in self.courses)
+        if len(set(self.courses)) != len(self.courses):
+            raise ValueError(f"Courses must be distinct: {', '.join(self.courses)}")
+        if all(self.optional):
+            raise ValueError("A course schema needs at least one required course")
+
+    @classmethod
+    def parse(cls, spec):
+        if isinstance(spec, CourseSchema):
+            return spec
+        names = [name.strip() for name in spec.split(',') if name.strip()]
+        return cls([name.rstrip('?') for name in names], [name.rstrip('?') for name in names if name.endswith('?')])
+
+    def __str__(self):
+        return ','.join(course + ('?' if optional else '') for course, optional in zip(self.courses, self.optional))
+
+    def __repr__(self):
+        return f"CourseSchema({str(self)!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, CourseSchema) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __len__(self):
+        return len(self.courses)
+
+    @property
+    def columns(self):
+        columns = []
+        for course in self.courses:
+            columns += [course, f'{course}_taste', f'{course}_calories', f'{course}_popularity']
+        return columns + ['total_calories', 'avg_popularity', 'taste_diversity', 'combo_score']
+
+
+DEFAULT_SCHEMA = CourseSchema(('main', 'side', 'drink'))
+
+
+def _taste_count(masks, n_tastes):
+    count = np.zeros(np.shape(masks), dtype=np.int64)
+    for taste in range(n_tastes):
+        count += (masks >> taste) & 1
+    return count
+
+
+class CourseItems:
+    # Per-course item arrays for a schema, the ItemStore of an arbitrary course structure. An
+    # optional course gets one extra option at the end, "skipped": no calories, no popularity and
+    # no taste, and it does not count towards avg_popularity. Combos are numbered like a C-order
+    # product of the options, so for main,side,drink positions match generate_all_combos rows.
+    def __init__(self, data, schema=DEFAULT_SCHEMA, scoring=DEFAULT_SCORING):
+        self.schema = CourseSchema.parse(schema)
+        self.scoring = scoring
+        frames = [data[data['category'] == course] for course in self.schema.courses]
+        taste_codes, self.tastes = pd.factorize(pd.concat([items['taste_profile'] for items in frames],
+                                                          ignore_index=True))
+        if len(self.tastes) > 62:
+            raise ValueError(f"Course combos support up to 62 taste profiles, the menu has {len(self.tastes)}")
+        self.calorie_dtype = np.result_type(*[items['calories'].dtype for items in frames])
+        bounds = np.cumsum([0] + [len(items) for items in frames])
+
+        self.names, self.calories, self.popularity, self.counts, self.taste_codes = [], [], [], [], []
+        for c, (items, optional) in enumerate(zip(frames, self.schema.optional)):
+            skip = int(optional)
+            self.names.append(np.append(items['item_name'].to_numpy(dtype=object), np.full(skip, None)))
+            self.calories.append(np.append(items['calories'].to_numpy(), np.zeros(skip)).astype(self.calorie_dtype))
+            self.popularity.append(np.append(items['popularity_score'].to_numpy().astype(np.float64), np.zeros(skip)))
+            self.counts.append(np.append(np.ones(len(items)), np.zeros(skip)).astype(np.int64))
+            self.taste_codes.append(np.append(taste_codes[bounds[c]:bounds[c + 1]], np.full(skip, -1)).astype(np.int64))
+        self.masks = [np.where(codes >= 0, np.left_shift(1, np.maximum(codes, 0)), 0) for codes in self.taste_codes]
+        self.sizes = tuple(len(calories) for calories in self.calories)
+
+    def most_popular(self, n):
+        # The same courses cut down to the n most popular options of each (skipped ones come last)
+        sub = copy.copy(self)
+        keep = [np.sort(np.argsort(-popularity, kind='stable')[:n]) for popularity in self.popularity]
+        for name in ('names', 'calories', 'popularity', 'counts', 'taste_codes', 'masks'):
+            setattr(sub, name, [values[ids] for values, ids in zip(getattr(self, name), keep)])
+        sub.sizes = tuple(len(ids) for ids in keep)
+        return sub
+
+    @property
+    def n_combos(self):
+        return int(np.prod(self.sizes, dtype=object))
+
+    def features(self, idx):
+        # Exact features of the combos with per-course option indices idx, summed in course order
+        # (the same operation order as combo_features for main, side, drink)
+        total_calories = self.calories[0][idx[0]]
+        popularity = self.popularity[0][idx[0]]
+        count = self.counts[0][idx[0]]
+        masks = self.masks[0][idx[0]]
+        for c in range(1, len(self.sizes)):
+            total_calories = total_calories + self.calories[c][idx[c]]
+            popularity = popularity + self.popularity[c][idx[c]]
+            count = count + self.counts[c][idx[c]]
+            masks = masks | self.masks[c][idx[c]]
+        avg_popularity = popularity / count
+        taste_diversity = _taste_count(masks, len(self.tastes))
+        return (total_calories, avg_popularity, taste_diversity,
+                self.scoring.score(total_calories, avg_popularity, taste_diversity))
+
+    def frame(self, positions):
+        idx = np.unravel_index(np.asarray(positions, dtype=np.int64), self.sizes)
+        columns = {}
+        tastes = np.append(np.asarray(self.tastes, dtype=object), [None])
+        for c, course in enumerate(self.schema.courses):
+            pick = idx[c]
+            columns[course] = self.names[c][pick]
+            columns[f'{course}_taste'] = tastes[self.taste_codes[c][pick]]
+            columns[f'{course}_calories'] = self.calories[c][pick]
+            columns[f'{course}_popularity'] = np.where(self.counts[c][pick] > 0, self.popularity[c][pick], np.nan)
+        for name, values in zip(self.schema.columns[-4:], self.features(idx)):
+            columns[name] = values
+        return pd.DataFrame(columns, columns=self.schema.columns, index=np.asarray(positions, dtype=np.int64))
+
+
+class _Partials:
+    # Every surviving combination of a run of courses: option indices per course plus the
+    # running calorie sum, popularity sum, item count and taste mask
+    def __init__(self, idx, calories, popularity, count, masks):
+        self.idx, self.calories, self.popularity, self.count, self.masks = idx, calories, popularity, count, masks
+
+    def __len__(self):
+        return len(self.calories)
+
+    def take(self, keep):
+        return _Partials([ids[keep] for ids in self.idx], self.calories[keep], self.popularity[keep],
+                         self.count[keep], self.masks[keep])
+
+
+def _split(sizes):
+    # Contiguous halves with the most balanced number of partial combos
+    if len(sizes) == 1:
+        return 0
+    products = [(max(np.prod(sizes[:s], dtype=float), np.prod(sizes[s:], dtype=float)), s)
+                for s in range(1, len(sizes))]
+    return min(products)[1]
+
+
+def _partials(items, courses, rest_low, rest_high, rest_slack, lo, hi, floor, slack):
+    # Product of the given courses, one course at a time, dropping partial combos that cannot
+    # reach the calorie range or the popularity floor whatever the remaining courses add.
+    # rest_*[c] bound what courses[c + 1:] plus every course outside `courses` can still add.
+    # Under a floor each course's options are ordered by their popularity slack, so the options
+    # that keep a partial above the floor are a prefix and the rest are never generated.
+    partials = _Partials([], np.zeros(1, dtype=items.calorie_dtype), np.zeros(1), np.zeros(1, dtype=np.int64),
+                         np.zeros(1, dtype=np.int64))
+    for step, c in enumerate(courses):
+        n, m = len(partials), items.sizes[c]
+        if floor > -np.inf:
+            option_slack = items.popularity[c] - floor * items.counts[c]
+            order = np.argsort(-option_slack, kind='stable')
+            need = -slack - rest_slack[step] - (partials.popularity - floor * partials.count)
+            counts = np.searchsorted(-option_slack[order], -need, side='right')
+            left = np.repeat(np.arange(n), counts)
+            right = order[np.arange(len(left)) - np.repeat(np.cumsum(counts) - counts, counts)]
+        else:
+            left, right = np.repeat(np.arange(n), m), np.tile(np.arange(m), n)
+        calories = partials.calories[left] + items.calories[c][right]
+        keep = (calories + rest_low[step] <= hi) & (calories + rest_high[step] >= lo)
+        left, right = left[keep], right[keep]
+        partials = _Partials([ids[left] for ids in partials.idx] + [right], calories[keep],
+                             partials.popularity[left] + items.popularity[c][right],
+                             partials.count[left] + items.counts[c][right],
+                             partials.masks[left] | items.masks[c][right])
+    return partials
+
+
+def _average_floor(items, threshold, lo, hi, max_diversity, slack):
+    # Average popularity below which no combo in the calorie range can score threshold, whatever
+    # its calories and taste diversity; -inf when popularity alone never rules a combo out
+    scoring = items.scoring
+    cal_low = max(lo, float(sum(calories.min() for calories in items.calories)))
+    cal_high = min(hi, float(sum(calories.max() for calories in items.calories)))
+    target = threshold - slack - scoring.calorie_bound(cal_low, cal_high)
+    low, high = 0.0, max(float(popularity.max()) for popularity in items.popularity)
+    if scoring.average_bound(low, max_diversity) >= target:
+        return -np.inf
+    # average_bound is nondecreasing, so bisect for the last average that still falls short
+    for _ in range(50):
+        middle = (low + high) / 2
+        if scoring.average_bound(middle, max_diversity) >= target:
+            high = middle
+        else:
+            low = middle
+    return low
+
+
+def top_course_positions(items, k, calorie_range=None, min_popularity=None, block_size=65536, n_bands=None,
+                         seed_combos=65536):
+    # Top k combos of an arbitrary course schema without enumerating the product. The courses are
+    # split into two halves whose partial combos are built with early pruning; the right half is
+    # sorted by calories and cut into calorie bands, and each left partial is joined only against
+    # the bands inside its calorie window, best band bound first, until no band can beat the
+    # current k-th score. Returns positions and scores, best first, ties by position.
+    # Products over seed_combos are first searched over just their most popular options (about
+    # the square root of the product, searched the same way). That seed's k-th score is a floor
+    # for the k-th score overall, and the average popularity it takes to reach it prunes the
+    # halves like a min_popularity would, so they hold a small part of their product.
+    if k <= 0 or 0 in items.sizes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    scoring = items.scoring
+    lo, hi = calorie_range if calorie_range is not None else (-np.inf, np.inf)
+    floor = min_popularity if min_popularity is not None else -np.inf
+    slack = 1e-9
+    n_courses = len(items.sizes)
+    max_diversity = min(len(items.tastes), n_courses)
+    seed, prune_floor = -np.inf, floor
+    if items.n_combos > seed_combos:
+        per_course = max(1, int(items.n_combos ** (0.5 / n_courses)))
+        _, seed_scores = top_course_positions(items.most_popular(per_course), k, calorie_range, min_popularity,
+                                              block_size, n_bands, seed_combos)
+        if len(seed_scores) == k:
+            seed = float(seed_scores[-1])
+            prune_floor = max(floor, _average_floor(items, seed, lo, hi, max_diversity, slack))
+
+    # Per-course bounds and, for each position in course order, what the courses after it can add
+    min_cal = np.array([calories.min() for calories in items.calories], dtype=float)
+    max_cal = np.array([calories.max() for calories in items.calories], dtype=float)
+    max_slack = np.array([(popularity - prune_floor * counts).max() if prune_floor > -np.inf else 0.0
+                          for popularity, counts in zip(items.popularity, items.counts)])
+    split = _split(items.sizes)
+    after = [np.append(np.cumsum(values[::-1])[::-1], 0) for values in (min_cal, max_cal, max_slack)]
+    # Left course c is completed by courses c + 1.. (including the whole right half); right course c
+    # by its own tail plus the whole left half
+    left_rest = [tail[1:split + 1] for tail in after]
+    right_rest = [tail[split + 1:] - tail[split] + tail[0] for tail in after]
+    left = _partials(items, range(split), *left_rest, lo, hi, prune_floor, slack)
+    right = _partials(items, range(split, n_courses), *right_rest, lo, hi, prune_floor, slack)
+    if len(left) == 0 or len(right) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # Calorie bands over the right partials: contiguous runs of the calorie order with their
+    # calorie span and, per item count, the best popularity sum
+    order = np.argsort(right.calories, kind='stable')
+    right = right.take(order)
+    n_bands = min(n_bands or int(np.clip(len(right) // 256, 1, 256)), len(right))
+    starts = np.unique(np.arange(n_bands) * len(right) // n_bands)
+    stops = np.append(starts[1:], len(right))
+    band_low, band_high = right.calories[starts].astype(float), right.calories[stops - 1].astype(float)
+    right_counts = np.unique(right.count)
+    band_pop = np.full((len(right_counts), len(starts)), -np.inf)
+    band_of = np.repeat(np.arange(len(starts)), stops - starts)
+    for i, count in enumerate(right_counts):
+        rows = right.count == count
+        np.maximum.at(band_pop[i], band_of[rows], right.popularity[rows])
+
+    def avg_bound(popularity, count, pop):
+        # Best (popularity + right popularity) / (count + right count), with pop[i] the best right
+        # popularity sum among right partials of right_counts[i] items
+        totals = count + right_counts.reshape((-1,) + (1,) * (np.ndim(pop) - 1))
+        return np.max(np.where(totals > 0, (popularity + pop) / np.maximum(totals, 1), -np.inf), axis=0)
+
+    cal_low = max(lo, float(left.calories.min()) + band_low[0])
+    cal_high = min(hi, float(left.calories.max()) + band_high[-1])
+    cal_bound = scoring.calorie_bound(cal_low, cal_high) if cal_low <= cal_high else -np.inf
+    left_average = avg_bound(left.popularity, left.count, band_pop.max(axis=1)[:, None])
+    left_bounds = scoring.average_bound(left_average, max_diversity) + cal_bound
+    visit = np.argsort(-left_bounds, kind='stable')
+
+    # Left partials are visited best bound first in doubling groups, each group's band bounds
+    # computed at once; only (left partial, band) pairs that can still beat the k-th score are joined
+    heap = []
+    done, group = 0, 1
+    while done < len(visit):
+        threshold = heap[0][0] if len(heap) == k else seed
+        batch = visit[done:done + group]
+        batch = batch[left_bounds[batch] >= threshold - slack]
+        if len(batch) == 0:
+            break
+        done, group = done + group, min(2 * group, 1024)
+        calories = left.calories[batch, None]
+        low, high = np.maximum(lo, calories + band_low), np.minimum(hi, calories + band_high)
+        averages = avg_bound(left.popularity[batch, None], left.count[batch, None], band_pop[:, None, :])
+        bounds = scoring.average_bound(averages, max_diversity) + scoring.calorie_bound(low, high)
+        bounds = np.where(low <= high, bounds, -np.inf).ravel()
+        if prune_floor > -np.inf:
+            bounds = np.where(averages.ravel() >= prune_floor - slack, bounds, -np.inf)
+        pairs = np.flatnonzero(bounds >= threshold - slack)
+        for pair in pairs[np.argsort(-bounds[pairs], kind='stable')]:
+            threshold = heap[0][0] if len(heap) == k else seed
+            if bounds[pair] < threshold - slack:
+                break
+            a, band = batch[pair // len(starts)], pair % len(starts)
+            for start in range(starts[band], stops[band], block_size):
+                rows = np.arange(start, min(start + block_size, stops[band]))
+                idx = [np.full(len(rows), ids[a]) for ids in left.idx] + [ids[rows] for ids in right.idx]
+                total_calories, avg_popularity, _, combo_score = items.features(idx)
+                keep = ((total_calories >= lo) & (total_calories <= hi)
+                        & (avg_popularity >= floor) & (combo_score >= threshold))
+                if not keep.any():
+                    continue
+                positions = np.ravel_multi_index([ids[keep] for ids in idx], items.sizes)
+                scores = combo_score[keep]
+                for i in np.lexsort((positions, -scores))[:k]:
+                    entry = (float(scores[i]), -int(positions[i]))
+                    if len(heap) < k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                    else:
+                        break
+                threshold = heap[0][0] if len(heap) == k else seed
+
+    ranked = sorted(heap, reverse=True)
+    positions = np.array([-position for _, position in ranked], dtype=np.int64)
+    return positions, np.array([score for score, _ in ranked], dtype=np.float64)
+
+
+def top_course_combos(items, k, calorie_range=None, min_popularity=None):
+    positions, _ = top_course_positions(items, k, calorie_range, min_popularity)
+    return items.frame(positions)
@@ -0,0 +1,34 @@
+import math
+import time
+
+
+class Deadline:
+    # Latency budget for one plan request. The pruned searches check it between blocks; once it
+    # has run out, a search that already holds a full answer stops there and records how much
+    # better the part it skipped could still score. Pass the same Deadline to every call of the
+    # request and read report() afterwards.
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.start = time.perf_counter()
+        self.expires = self.start + budget_ms / 1000
+        self.interrupted = False
+        self.gap = 0.0
+
+    def expired(self):
+        return time.perf_counter() >= self.expires
+
+    def interrupt(self, bound, best):
+        # A search stopped early: nothing it skipped scores above bound, and best is the lowest
+        # score it returns. The gap is the most any returned pick could have improved.
+        self.interrupted = True
+        self.gap = max(self.gap, float(bound - best), 0.0)
+
+    def report(self):
+        # complete means the result is exactly the one without a deadline; otherwise
+        # optimality_gap bounds how much higher a day's combo_score could have been
+        return {
+            'complete': not self.interrupted,
+            'optimality_gap': round(self.gap, 6) if math.isfinite(self.gap) else None,
+            'elapsed_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'budget_ms': self.budget_ms,
+        }
@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+from catalog import menu_hash  # noqa: F401  (re-exported, the cache key)
+from model import MenuRecommender
+
+
+class EngineCache:
+    # Warm MenuRecommender instances shared by every session in the process, least recently
+    # used first out once more than max_size menus are cached or, with max_bytes, once their
+    # combined footprint (MenuRecommender.nbytes) is over budget. Footprints are re-measured on
+    # every hit, so combo tables an engine builds lazily count as soon as it is used again.
+    # Each menu also keeps up to max_scored engines for other scoring specs (see scored()).
+    def __init__(self, max_size=8, factory=MenuRecommender, max_bytes=None, max_scored=16):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.max_scored = max_scored
+        self.factory = factory
+        self._engines = OrderedDict()
+        self._scored = {}
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __contains__(self, data):
+        return self._key(data) in self._engines
+
+    def _key(self, data):
+        return menu_hash(data)
+
+    def _load(self, data):
+        return data
+
+    def _edited_key(self, data, engine):
+        return menu_hash(engine.data)
+
+    def get(self, data):
+        key = self._key(data)
+        with self._lock:
+            if key in self._engines:
+                self.hits += 1
+                return self._file(key, self._engines[key])
+            self.misses += 1
+
+        engine = self.factory(self._load(data))
+        engine.warm()
+
+        with self._lock:
+            return self._file(key, self._engines.get(key, engine))
+
+    def scored(self, data, spec):
+        # Engine for data's menu under another ScoringSpec, from with_scoring on the cached engine.
+        # The most recently used max_scored specs are kept with it: their own scores and ranking
+        # (MenuRecommender.scoring_nbytes) count toward max_bytes, and they go whenever it is
+        # evicted, updated or invalidated.
+        key = self._key(data)
+        engine = self.get(data)
+        with self._lock:
+            variants = self._scored.get(key, {})
+            if spec in variants:
+                variants.move_to_end(spec)
+                return variants[spec]
+
+        scored = engine.with_scoring(spec)
+
+        with self._lock:
+            if self._engines.get(key) is not engine:
+                # Evicted or replaced while rescoring: nothing left to file it with
+                return scored
+            variants = self._scored.setdefault(key, OrderedDict())
+            scored = variants.setdefault(spec, scored)
+            variants.move_to_end(spec)
+            while len(variants) > self.max_scored:
+                variants.popitem(last=False)
+            self._file(key, engine)
+            return scored
+
+    def _file(self, key, engine):
+        # (Re)files engine as the most recently used, measures it and evicts down to the budget.
+        # The engine being handed out always stays, even when it alone is over max_bytes.
+        self._engines[key] = engine
+        self._engines.move_to_end(key)
+        size = engine.nbytes + sum(scored.scoring_nbytes for scored in self._scored.get(key, {}).values())
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        while len(self._engines) > 1 and self._over_budget():
+            self._pop(next(iter(self._engines)))
+            self.evictions += 1
+        return engine
+
+    def _over_budget(self):
+        return ((self.max_size is not None and len(self._engines) > self.max_size)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    def _pop(self, key):
+        self._bytes -= self._sizes.pop(key, 0)
+        self._scored.pop(key, None)
+        return self._engines.pop(key, None)
+
+    def update(self, data, edit):
+        # Applies edit(engine) (e.g. lambda engine: engine.update_item(...)) to a copy of the engine
+        # cached for data and files the copy under the edited menu in its place; returns the copy.
+        # Threads still searching the old engine keep a consistent one, and the swap is atomic.
+        # Edits are serialized with each other, so concurrent updates to one restaurant all apply.
+        with self._update_lock:
+            engine = self.get(data).copy()
+            edit(engine)
+            with self._lock:
+                self._pop(self._key(data))
+                return self._file(self._edited_key(data, engine), engine)
+
+    def invalidate(self, data):
+        with self._lock:
+            return self._pop(self._key(data)) is not None
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+            self._scored.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._engines),
+                'max_size': self.max_size,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'scored': sum(len(variants) for variants in self._scored.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class EnginePool(EngineCache):
+    # Engines for many restaurants in one process, keyed by restaurant ID instead of menu content.
+    # load_menu(restaurant_id) (e.g. a catalog.MenuDirectory) supplies the menu on first use and
+    # again after an eviction. Bounded by max_bytes rather than a count, so a worker keeps as
+    # many warm menus as fit and reloads the cold ones on demand.
+    def __init__(self, load_menu, max_bytes=None, max_size=None, factory=MenuRecommender, max_scored=16):
+        super().__init__(max_size, factory, max_bytes, max_scored)
+        self.load_menu = load_menu
+
+    def _key(self, restaurant_id):
+        return restaurant_id
+
+    def _load(self, restaurant_id):
+        return self.load_menu(restaurant_id)
+
+    def _edited_key(self, restaurant_id, engine):
+        return restaurant_id
+
+    def restaurants(self):
+        # Cached restaurant IDs with their footprint in bytes, least recently used first
+        with self._lock:
+            return [(key, self._sizes[key]) for key in self._engines]
@@ -0,0 +1,72 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Metrics:
+    # Wall time per pipeline stage and event counters for one recommender. Recording is a lock
+    # and a few additions, cheap enough to leave on in production; engines shared through the
+    # EngineCache aggregate over every session and thread in the process.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_profile = None
+        self.reset()
+
+    def __getstate__(self):
+        # Engines are pickled into worker processes; the copy gets a lock of its own
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            stage = self._stages.setdefault(name, [0, 0.0, 0.0])
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def snapshot(self):
+        # Plain dicts, ready for JSON: per stage calls / total / mean / max in milliseconds
+        with self._lock:
+            stages = {name: {'calls': calls, 'total_ms': round(total * 1000, 3),
+                             'mean_ms': round(total * 1000 / calls, 3), 'max_ms': round(longest * 1000, 3)}
+                      for name, (calls, total, longest) in self._stages.items()}
+            return {'stages': stages, 'counters': dict(self._counters)}
+
+    @contextmanager
+    def profile(self, sort='cumulative', limit=30):
+        # cProfile the block (calling thread only); the report text is kept in last_profile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(limit)
+            self.last_profile = stream.getvalue()
@@ -1,26 +1,64 @@
+import copy
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from itertools import product
+import charts
+from catalog import load_catalog, menu_hash, validate_chunk
+from combo_engine import CATEGORIES, top_combos
+from combo_index import ComboIndex
+from combo_store import ComboStore, ItemStore
+from courses import CourseItems, CourseSchema, top_course_positions
+from metrics import Metrics
+from parallel import sharded_top_combos, worker_pool
+from scoring import DEFAULT_SCORING
+from planner import (PlanCandidates, greedy_plan, greedy_taste_plan, beam_plan, plan_score, search_greedy_plan,
+                     search_taste_plan)
 import warnings
 
 warnings.filterwarnings('ignore')
 
 
 class MenuRecommender:
-    def __init__(self, data):
+    verbose = False
+    search_size = 32
+    max_indexed_combos = 2_000_000
+    # Worker processes for the top-k search; 1 keeps everything in this process. Smaller
+    # menus stay serial, where dispatch costs more than it saves.
+    workers = 1
+    parallel_min_combos = 1_000_000
+    # ScoringSpec for combo_score; change it with set_scoring / with_scoring so caches follow
+    scoring = DEFAULT_SCORING
+
+    def __init__(self, data, scoring=None):
+        if scoring is not None:
+            self.scoring = scoring
+        self.metrics = Metrics()
+        self._set_data(data)
+        self._combo_store = None
+        self._combo_index = None
+
+    def _set_data(self, data):
         self.data = data
         self.main_items = data[data['category'] == 'main']
         self.side_items = data[data['category'] == 'side']
         self.drink_items = data[data['category'] == 'drink']
+        self.items = ItemStore(self.main_items, self.side_items, self.drink_items, self.scoring)
+        self._course_items = {}
+        self._menu_hash = None
+        frames = (self.data, self.main_items, self.side_items, self.drink_items)
+        self._frame_nbytes = sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        # path may be a snapshot directory or a CSV/Parquet export with a snapshot cached beside it
+        return cls(load_catalog(path).frame())
 
     def calculate_combo_score(self, main, side, drink):
         total_calories = main['calories'] + side['calories'] + drink['calories']
         avg_popularity = (main['popularity_score'] + side['popularity_score'] + drink['popularity_score']) / 3
         taste_profiles = {main['taste_profile'], side['taste_profile'], drink['taste_profile']}
         taste_diversity = len(taste_profiles)
-        combo_score = avg_popularity * taste_diversity * 0.1 + (1000 - abs(total_calories - 800)) * 0.001
+        combo_score = self.scoring.score(total_calories, avg_popularity, taste_diversity)
 
         return {
             'total_calories': total_calories,
@@ -29,57 +67,333 @@ class MenuRecommender:
             'combo_score': combo_score
         }
 
+    def set_scoring(self, scoring):
+        # New weights or calorie target: rescore the cached combo features and re-rank the index
+        # in place; the Cartesian product and the calorie/popularity buckets are left alone
+        with self.metrics.stage('rescore'):
+            self.scoring = scoring
+            self.items.scoring = scoring
+            self._course_items = {}
+            if self._combo_store is not None:
+                self._combo_store.rescore_all()
+            if self._combo_index is not None:
+                self._combo_index.rerank()
+        return self
+
+    def with_scoring(self, scoring):
+        # Engine for another spec (a restaurant, a customer segment) that shares this engine's
+        # items, combo features and buckets; only the scores and the ranking are its own
+        engine = copy.copy(self)
+        engine.metrics = Metrics()
+        engine.items = copy.copy(self.items)
+        if self._combo_store is not None:
+            self._combo_store.features()
+            engine._combo_store = copy.copy(self._combo_store)
+            engine._combo_store.items = engine.items
+        if self._combo_index is not None:
+            engine._combo_index = copy.copy(self._combo_index)
+            engine._combo_index.store = engine._combo_store
+        return engine.set_scoring(scoring)
+
+    def copy(self):
+        # Engine that can be edited without touching this one, for swapping in while other threads
+        # still search this one. Menu edits replace the copy's frames and item arrays and patch
+        # its own combo store and index; combo_score, the one array they write into, is copied.
+        engine = copy.copy(self)
+        if self._combo_store is not None:
+            engine._combo_store = copy.copy(self._combo_store)
+            engine._combo_store.combo_score = self._combo_store.combo_score.copy()
+        if self._combo_index is not None:
+            engine._combo_index = copy.copy(self._combo_index)
+            engine._combo_index.store = engine._combo_store
+        return engine
+
+    def _pool(self):
+        if self.workers > 1 and self.items.n_combos >= self.parallel_min_combos:
+            return worker_pool(self.workers)
+        return None
+
+    def combo_store(self):
+        if self._combo_store is None:
+            with self.metrics.stage('generate'):
+                self._combo_store = ComboStore.build(self.items)
+        return self._combo_store
+
     def generate_all_combos(self):
-        combos = []
-        for _, main in self.main_items.iterrows():
-            for _, side in self.side_items.iterrows():
-                for _, drink in self.drink_items.iterrows():
-                    combo_info = self.calculate_combo_score(main, side, drink)
-                    combos.append({
-                        'main': main['item_name'],
-                        'main_taste': main['taste_profile'],
-                        'main_calories': main['calories'],
-                        'main_popularity': main['popularity_score'],
-                        'side': side['item_name'],
-                        'side_taste': side['taste_profile'],
-                        'side_calories': side['calories'],
-                        'side_popularity': side['popularity_score'],
-                        'drink': drink['item_name'],
-                        'drink_taste': drink['taste_profile'],
-                        'drink_calories': drink['calories'],
-                        'drink_popularity': drink['popularity_score'],
-                        'total_calories': combo_info['total_calories'],
-                        'avg_popularity': combo_info['avg_popularity'],
-                        'taste_diversity': combo_info['taste_diversity'],
-                        'combo_score': combo_info['combo_score']
-                    })
-        return pd.DataFrame(combos)
-
-    def recommend_3_day_menu(self, calorie_range=(700, 900), min_popularity=0.7, ensure_diversity=True):
-        all_combos = self.generate_all_combos()
-        filtered = all_combos[
-            (all_combos['total_calories'] >= calorie_range[0]) &
-            (all_combos['total_calories'] <= calorie_range[1]) &
-            (all_combos['avg_popularity'] >= min_popularity)
-        ].copy()
-
-        if len(filtered) < 3:
-            filtered = all_combos.nlargest(10, 'combo_score')
-        filtered = filtered.sort_values('combo_score', ascending=False)
-        selected, used_items = [], set()
-        for _, combo in filtered.iterrows():
-            items = {combo['main'], combo['side'], combo['drink']}
-            if ensure_diversity and items & used_items:
-                continue
-            selected.append(combo)
-            used_items |= items
-            if len(selected) == 3:
-                break
-        while len(selected) < 3 and len(filtered) > len(selected):
-            combo = filtered.iloc[len(selected)]
-            selected.append(combo)
+        store = self.combo_store()
+        with self.metrics.stage('materialize'):
+            return store.frame()
+
+    def top_combos(self, k, calorie_range=None, min_popularity=None, allowed=None, deadline=None):
+        # A deadline keeps the search in this process, where it can stop it between blocks
+        pool = self._pool() if deadline is None else None
+        with self.metrics.stage('search'):
+            if pool:
+                return sharded_top_combos(self.items, pool, self.workers, k, calorie_range, min_popularity, allowed)
+            return top_combos(self.items, k, calorie_range, min_popularity, allowed, deadline=deadline)
+
+    def course_items(self, schema):
+        # Per-course arrays for a CourseSchema (or its 'starter?,main,...' string), kept per schema
+        schema = CourseSchema.parse(schema)
+        if schema not in self._course_items:
+            self._course_items[schema] = CourseItems(self.data, schema, self.scoring)
+        return self._course_items[schema]
+
+    def top_course_combos(self, schema, k, calorie_range=None, min_popularity=None):
+        # top_combos for any course structure, e.g. optional starters and desserts. The courses are
+        # joined as two halves of partial combos on calorie bands, so the product is never built;
+        # for 'main,side,drink' the result equals top_combos. Ranked combos only: the planners,
+        # plan table and app plan main, side and drink.
+        items = self.course_items(schema)
+        with self.metrics.stage('courses'):
+            positions, _ = top_course_positions(items, k, calorie_range, min_popularity)
+            return items.frame(positions)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def combo_index(self):
+        if self._combo_index is None:
+            store = self.combo_store()
+            with self.metrics.stage('index'):
+                self._combo_index = ComboIndex(store)
+        return self._combo_index
+
+    @property
+    def nbytes(self):
+        # Approximate footprint: menu frames, item arrays and the combo store and index once built.
+        # Engines from with_scoring share features and buckets, so each counts them in full.
+        size = self._frame_nbytes + self.items.nbytes
+        if self._combo_store is not None:
+            size += self._combo_store.nbytes
+        if self._combo_index is not None:
+            size += self._combo_index.nbytes
+        return size
+
+    @property
+    def scoring_nbytes(self):
+        # What an engine from with_scoring adds to the engine it shares features and buckets with:
+        # its own combo scores and ranking
+        size = 0
+        if self._combo_store is not None:
+            size += self._combo_store.combo_score.nbytes
+        if self._combo_index is not None:
+            size += self._combo_index.ranked.nbytes + self._combo_index.rank.nbytes
+        return size
+
+    def warm(self):
+        # Build everything ranked_search needs up front so the first request is not the slow one
+        if self.items.n_combos <= self.max_indexed_combos:
+            self.combo_index()
+        return self
+
+    # Menu edits. Each one swaps in an edited copy of the menu (the caller's DataFrame is never
+    # modified), rescores only the combos containing the edited item and patches the combo store
+    # and index in place; results match a MenuRecommender built from the edited menu.
+
+    def _item_rows(self, item_name):
+        rows = np.flatnonzero((self.data['item_name'] == item_name).to_numpy())
+        if len(rows) == 0:
+            raise KeyError(f"No menu item named {item_name!r}")
+        return rows
+
+    def _item_slot(self, row):
+        # (category axis, position within the category) of a data row, None for other categories
+        categories = self.data['category'].to_numpy()
+        if categories[row] not in CATEGORIES:
+            return None
+        return CATEGORIES.index(categories[row]), int((categories[:row] == categories[row]).sum())
+
+    def _patch(self, edit):
+        if self._combo_store is None:
+            return
+        with self.metrics.stage('edit'):
+            change = edit(self._combo_store)
+            if self.items.n_combos > self.max_indexed_combos:
+                self._combo_index = None
+            elif self._combo_index is not None:
+                self._combo_index.patch(*change)
+
+    def update_item(self, item_name, popularity_score=None, calories=None):
+        rows = self._item_rows(item_name)
+        changes = {column: value for column, value in
+                   (('popularity_score', popularity_score), ('calories', calories)) if value is not None}
+        edited = validate_chunk(self.data.iloc[rows].assign(**changes))
+        data = self.data.copy()
+        for column in changes:
+            # Whole-column assignment: snapshot-backed menus have read-only, compact-dtype columns
+            values = data[column].to_numpy().copy()
+            values[rows] = edited[column].to_numpy()
+            data[column] = values
+        self._set_data(data)
+        for slot in filter(None, map(self._item_slot, rows)):
+            self._patch(lambda store: store.rescore(self.items, *slot))
+        return self
+
+    def add_item(self, item_name, category, calories, taste_profile, popularity_score):
+        item = validate_chunk(pd.DataFrame([{
+            'item_name': item_name, 'category': category, 'calories': calories,
+            'taste_profile': taste_profile, 'popularity_score': popularity_score,
+        }]))
+        self._set_data(pd.concat([self.data, item], ignore_index=True))
+        slot = self._item_slot(len(self.data) - 1)
+        if slot is not None:
+            self._patch(lambda store: store.insert(self.items, slot[0]))
+        return self
+
+    def remove_item(self, item_name):
+        # Every row with this name goes, last first so earlier slots stay valid
+        for row in self._item_rows(item_name)[::-1]:
+            slot = self._item_slot(row)
+            self._set_data(self.data.iloc[np.delete(np.arange(len(self.data)), row)])
+            if slot is not None:
+                self._patch(lambda store: store.remove(self.items, *slot))
+        return self
+
+    def ranked_search(self, calorie_range, min_popularity, min_count, fallback_k, select, search=None,
+                      label='recommend_menu', positions=False, deadline=None, days=None):
+        # label names the caller in the metrics counters: <label>.requests, <label>.fallbacks,
+        # <label>.interrupted. positions=True returns generate_all_combos positions instead of
+        # combo rows. deadline (a Deadline) makes the search anytime, see deadline.py; it only
+        # cuts prefix widening short once the selection has all `days` picks.
+        metrics = self.metrics
+        metrics.count(f'{label}.requests')
+        with metrics.stage(label):
+            selected = self._ranked_search(calorie_range, min_popularity, min_count, fallback_k, select, search,
+                                           label, positions, deadline, days)
+        if deadline is not None and deadline.interrupted:
+            metrics.count(f'{label}.interrupted')
         return selected
-        
+
+    def _ranked_search(self, calorie_range, min_popularity, min_count, fallback_k, select, search, label,
+                       positions, deadline, days):
+        metrics = self.metrics
+
+        def timed_select(combos):
+            with metrics.stage('select'):
+                return select(combos)
+
+        def fallback():
+            # The original nlargest fallback: drop the filters and plan from the overall best combos
+            self._log("⚠️ Not enough combinations meet the criteria. Relaxing constraints...")
+            metrics.count(f'{label}.fallbacks')
+            return timed_select(fetch_top(fallback_k))[0]
+
+        def searched(pool, pool_size):
+            metrics.count('search_plans')
+            with metrics.stage('select'):
+                selected = search(pool, pool_size)
+            return [row.name for row in selected] if positions else selected
+
+        n_combos = self.items.n_combos
+        # Under a deadline a cold index is not built inline: the pruned search below picks the same
+        # plan and can stop at the deadline
+        if n_combos <= self.max_indexed_combos and (deadline is None or self._combo_index is not None):
+            index = self.combo_index()
+            with metrics.stage('filter'):
+                matches = index.match(calorie_range, min_popularity)
+            self._log(f"📊 {len(matches)} combinations meet the criteria")
+
+            def fetch(k):
+                # Only the ranked prefix the planner asks for is ever put in score order
+                with metrics.stage('sort'):
+                    prefix = index.first(matches, k)
+                return PlanCandidates.from_store(index.store, prefix, positions)
+
+            fetch_top = lambda k: PlanCandidates.from_store(index.store, index.ranked[:k], positions)
+            pool = lambda k: index.take(index.first(matches, k))
+        else:
+            self._log(f"🔄 Searching {n_combos} possible combinations...")
+            fetch = lambda k: PlanCandidates.from_frame(
+                self.top_combos(k, calorie_range, min_popularity, deadline=deadline), positions)
+            fetch_top = lambda k: PlanCandidates.from_frame(self.top_combos(k, deadline=deadline), positions)
+            if search is not None:
+                # Too many combos to rank up front: one pruned top-k search serves as the match count
+                # and as the pool every day is picked from, with a restricted search only for days the
+                # pool cannot answer
+                pool_size = max(self.search_size, min_count)
+                pool = self.top_combos(pool_size, calorie_range, min_popularity, deadline=deadline)
+                if len(pool) < min_count:
+                    return fallback()
+                return searched(pool, pool_size)
+
+        # Widen the ranked prefix until the selection no longer depends on combos past its end
+        k = max(self.search_size, min_count)
+        while True:
+            combos = fetch(k)
+            exhausted = len(combos) < k
+            if exhausted and len(combos) < min_count:
+                return fallback()
+            selected, settled = timed_select(combos)
+            if settled or exhausted:
+                return selected
+            if search is not None:
+                # Rather than widen the prefix, plan from it with a pruned search for each day it
+                # cannot answer; taste plans rarely settle, and each widening re-plans from scratch
+                return searched(pool(k), k)
+            if deadline is not None and days is not None and len(selected) >= days and deadline.expired():
+                # Keep the plan from this prefix: combos past it score at most its last one
+                picked = selected if positions else [row.name for row in selected]
+                idx = np.unravel_index(np.asarray(picked, dtype=np.int64), self.items.sizes)
+                deadline.interrupt(combos.scores[-1], self.items.features(idx)[3].min())
+                return selected
+            metrics.count('prefix_widenings')
+            k *= 4
+
+    def plan(self, cands, days, greedy, preferred_taste=None, mode='greedy', beam_width=8, distinct_tastes=False):
+        # distinct_tastes: later days must avoid the tastes already planned, as greedy_taste_plan
+        # does. The beam keeps to that rule, and the greedy plan's relaxed fill is only used when
+        # the beam finds no plan that does.
+        if mode not in ('greedy', 'beam'):
+            raise ValueError(f"Unknown planning mode: {mode!r}")
+        picks, settled = greedy(cands)
+        if mode == 'beam':
+            beam_picks, found = beam_plan(cands, days, preferred_taste, distinct_tastes, beam_width=beam_width)
+            # Settled stays the greedy plan's: a beam plan from a prefix that has not settled the
+            # greedy one is only a candidate, and widening may still turn up a better greedy plan
+            if found and (not settled or plan_score(cands, beam_picks) > plan_score(cands, picks)):
+                self.metrics.count('beam_improved')
+                picks = beam_picks
+        return cands.rows(picks), settled
+
+    def search_plan(self, pool, picks, days, preferred_taste=None, mode='greedy', beam_width=8,
+                    distinct_tastes=False):
+        # plan() for the search path: picks is the exact greedy plan from search_greedy_plan or
+        # search_taste_plan, and the beam runs over the shared pool those picks were drawn from
+        if mode not in ('greedy', 'beam'):
+            raise ValueError(f"Unknown planning mode: {mode!r}")
+        if mode == 'beam':
+            cands = PlanCandidates.from_frame(pool)
+            beam_picks, found = beam_plan(cands, days, preferred_taste, distinct_tastes, beam_width=beam_width)
+            if found and plan_score(cands, beam_picks) > sum(row['combo_score'] for row in picks):
+                self.metrics.count('beam_improved')
+                picks = cands.rows(beam_picks)
+        return picks
+
+    def recommend_menu(self, days=3, calorie_range=(700, 900), min_popularity=0.7, ensure_diversity=True,
+                       mode='greedy', beam_width=8, deadline=None):
+        def select(filtered):
+            return self.plan(filtered, days, lambda cands: greedy_plan(cands, days, ensure_diversity),
+                             mode=mode, beam_width=beam_width)
+
+        def search(pool, pool_size):
+            picks = search_greedy_plan(self, days, calorie_range, min_popularity, ensure_diversity, deadline, pool,
+                                       pool_size)
+            return self.search_plan(pool, picks, days, mode=mode, beam_width=beam_width)
+
+        selected = self.ranked_search(calorie_range, min_popularity, days, max(10, 3 * days), select, search,
+                                      deadline=deadline, days=days)
+        items = [combo[column] for combo in selected for column in ('main', 'side', 'drink')]
+        if ensure_diversity and len(set(items)) < len(items):
+            self._log("⚠️ Not enough item-disjoint combinations. Some items repeat across days.")
+            self.metrics.count('recommend_menu.repeated_items')
+        return selected
+
+    def recommend_3_day_menu(self, calorie_range=(700, 900), min_popularity=0.7, ensure_diversity=True,
+                             deadline=None):
+        return self.recommend_menu(3, calorie_range, min_popularity, ensure_diversity, deadline=deadline)
+
     def display_recommendations(self, recommendations):
         total_calories = []
         total_popularity = []
@@ -102,33 +416,94 @@ class MenuRecommender:
         print(f"AVG POPULARITY  : {np.mean(total_popularity):.2f}")
         return pd.DataFrame(recommendations)
 
-    def plot_analysis(self):
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-        fig.suptitle('Menu Dataset Analysis', fontsize=16, fontweight='bold')
+    def menu_hash(self):
+        if self._menu_hash is None:
+            self._menu_hash = menu_hash(self.data)
+        return self._menu_hash
+
+    # Charts. render_* return encoded image bytes from charts.chart_cache, keyed by the menu hash
+    # (and the plotted combos), so repeats are free and an edited menu is simply a new key. With
+    # background=True they return a Future instead, rendered off the calling thread.
+
+    def render_analysis(self, fmt='png', max_points=charts.MAX_SCATTER_POINTS, background=False):
+        data = self.data
+
+        def render():
+            with self.metrics.stage('render'):
+                return charts.render_analysis(data, fmt, max_points)
 
-        cat_calories = self.data.groupby('category')['calories'].mean()
-        axes[0, 0].bar(cat_calories.index, cat_calories.values, color=['skyblue', 'lightgreen', 'lightcoral'])
-        axes[0, 0].set_title('Average Calories by Category')
+        future = charts.chart_cache.submit(('analysis', self.menu_hash(), fmt, max_points), render)
+        return future if background else future.result()
 
-        axes[0, 1].hist(self.data['popularity_score'], bins=10, color='gold', alpha=0.7)
-        axes[0, 1].set_title('Popularity Score Distribution')
+    def render_recommendations(self, recommendations, fmt='png', background=False):
+        frame = pd.DataFrame(recommendations)
 
-        taste_counts = self.data['taste_profile'].value_counts()
-        axes[1, 0].bar(taste_counts.index, taste_counts.values, color=['orange', 'purple', 'green'])
-        axes[1, 0].set_title('Taste Profile Distribution')
+        def render():
+            with self.metrics.stage('render'):
+                return charts.render_recommendations(frame, fmt)
 
-        colors = {'main': 'red', 'side': 'blue', 'drink': 'green'}
-        for category in self.data['category'].unique():
-            d = self.data[self.data['category'] == category]
-            axes[1, 1].scatter(d['calories'], d['popularity_score'],
-                              c=colors[category], label=category, alpha=0.7, s=60)
+        key = ('recommendations', self.menu_hash(), charts.recommendation_key(frame), fmt)
+        future = charts.chart_cache.submit(key, render)
+        return future if background else future.result()
 
-        axes[1, 1].set_title('Calories vs Popularity by Category')
-        axes[1, 1].legend()
+    def plot_analysis(self, max_points=charts.MAX_SCATTER_POINTS):
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(figsize=(15, 10))
+        charts.draw_analysis(fig, charts.analysis_stats(self.data, max_points))
         plt.tight_layout()
         plt.show()
 
 
+def generate_flexible_combo(recommender, preferred_taste, calorie_range, min_popularity, days=3,
+                            mode='greedy', beam_width=8, positions=False, deadline=None):
+    def select(combos):
+        return recommender.plan(combos, days, lambda cands: greedy_taste_plan(cands, days, preferred_taste),
+                                preferred_taste, mode=mode, beam_width=beam_width, distinct_tastes=True)
+
+    def search(pool, pool_size):
+        picks = search_taste_plan(recommender, days, preferred_taste, calorie_range, min_popularity, deadline, pool,
+                                  pool_size)
+        return recommender.search_plan(pool, picks, days, preferred_taste, mode=mode, beam_width=beam_width,
+                                       distinct_tastes=True)
+
+    return recommender.ranked_search(calorie_range, min_popularity, max(10, 3 * days), max(30, 10 * days), select,
+                                     search, label='flexible_combo', positions=positions, deadline=deadline,
+                                     days=days)
+
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def plan_records(combos, preferred_taste=None, calorie_range=None, min_popularity=None, start_day=None):
+    # Plan in the sample_output.json shape
+    records = []
+    for i, combo in enumerate(combos):
+        tastes = [combo['main_taste'], combo['side_taste'], combo['drink_taste']]
+        taste = preferred_taste if i == 0 and preferred_taste in tastes else combo['main_taste']
+        day = DAYS[(DAYS.index(start_day) + i) % 7] if start_day else f"day {i + 1}"
+        reasons = [f"{taste.capitalize()} profile fits {day} trends"]
+        if min_popularity is None or combo['avg_popularity'] >= min_popularity:
+            reasons.append("popular choices")
+        else:
+            reasons.append("most popular available")
+        if calorie_range is None or calorie_range[0] <= combo['total_calories'] <= calorie_range[1]:
+            reasons.append("calorie target met")
+        else:
+            reasons.append("closest calorie match")
+        records.append({
+            'combo_id': i + 1,
+            'main': combo['main'],
+            'side': combo['side'],
+            'drink': combo['drink'],
+            'total_calories': int(combo['total_calories']),
+            'popularity_score': round(float(combo['main_popularity'] + combo['side_popularity']
+                                            + combo['drink_popularity']), 2),
+            'reasoning': ', '.join(reasons)
+        })
+    return records
+
+
 def load_menu_data():
     data = {
         'item_name': [
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from combo_engine import top_positions
+
+# Only the pruned top-k search is sharded. Building the store and generate_all_combos stay serial:
+# they are memory-bound, and sending their arrays back from the workers costs as much as computing
+# them, so they ran slower on a pool than in one process.
+#
+# One pool per worker count, shared by every recommender in the process. Tasks carry the
+# label-free ItemStore they score, so edited menus never leave a worker with stale items.
+_pools = {}
+
+
+def worker_pool(workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def sharded_top_combos(items, pool, shards, k, calorie_range=None, min_popularity=None, allowed=None):
+    # Mains dealt round-robin in popularity order, so every shard gets a similar share of the
+    # promising ones; each shard keeps its own top k and the union is cut back to k by score,
+    # then position, which is exactly the serial top_combos order
+    if allowed is None:
+        allowed = [np.ones(size, dtype=bool) for size in items.sizes]
+    mains = np.flatnonzero(allowed[0])
+    mains = mains[np.argsort(-items.popularity[0][mains], kind='stable')]
+    scoring = items.without_labels()
+    tasks = []
+    for shard in range(min(shards, len(mains))):
+        mask = np.zeros(items.sizes[0], dtype=bool)
+        mask[mains[shard::shards]] = True
+        tasks.append((scoring, k, calorie_range, min_popularity, [mask, allowed[1], allowed[2]]))
+    results = list(pool.map(top_positions, *zip(*tasks))) if tasks else []
+
+    positions = np.concatenate([np.zeros(0, dtype=np.int64)] + [positions for positions, _ in results])
+    scores = np.concatenate([np.zeros(0)] + [scores for _, scores in results])
+    order = np.lexsort((positions, -scores))[:max(k, 0)]
+    positions = positions[order]
+    return items.frame(np.unravel_index(positions, items.sizes), index=positions)
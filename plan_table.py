@@ -0,0 +1,382 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from catalog import MenuDirectory, load_menu_frame
+from engine_cache import menu_hash
+from model import MenuRecommender, generate_flexible_combo, load_menu_data
+from planner import PlanCandidates
+
+TABLE_VERSION = 2
+
+# The app's sidebar sliders: (low, high, step) for min_cal, max_cal and min_pop
+CONTROL_GRID = {'min_cal': (500, 1000, 1), 'max_cal': (600, 1200, 1), 'min_pop': (0.0, 1.0, 0.01)}
+# Size limit for a table: reachable slider cells over all tastes
+MAX_CELLS = 20_000_000
+
+
+class PlanTable:
+    # generate_flexible_combo results for every taste and every setting the sidebar sliders can
+    # reach. A plan only depends on which combos pass the calorie and popularity filters, and that
+    # set only changes where a slider crosses a total_calories or avg_popularity value some combo
+    # actually has. Each axis is therefore stored as the classes between those values that a
+    # slider position falls in, and each cell holds the id of its plan in a small table of
+    # distinct plans (combo positions, -1 padded). Settings off the slider steps may fall in a
+    # class no slider reaches; those are planned live.
+    def __init__(self, meta, cal_values, pop_values, axes, cells, plans):
+        self.meta = meta
+        self.cal_values = cal_values
+        self.pop_values = pop_values
+        self.axes = axes
+        self.cells = cells
+        self.plans = plans
+        self.tastes = list(meta['tastes'])
+
+    @classmethod
+    def build(cls, recommender, tastes=None, grid=CONTROL_GRID, days=3, max_cells=MAX_CELLS):
+        # Raises ValueError for menus whose table would be too large; those keep planning live
+        if recommender.items.n_combos > recommender.max_indexed_combos:
+            raise ValueError(f"{recommender.items.n_combos:,} combos is more than a plan table is built for "
+                             f"(max_indexed_combos={recommender.max_indexed_combos:,})")
+        store = recommender.combo_store()
+        total_calories, avg_popularity, _ = store.features()
+        cal_values = np.unique(total_calories).astype(np.int64)
+        pop_values = np.unique(avg_popularity)
+        if tastes is None:
+            tastes = recommender.items.tastes.tolist()
+
+        # Classes the sliders reach, on each axis: a combo passes cell (a, b, c) when its total's
+        # class is in [a, b) and its popularity's class is at least c
+        axes = (np.unique(np.searchsorted(cal_values, _slider_values(grid['min_cal']), side='left')),
+                np.unique(np.searchsorted(cal_values, _slider_values(grid['max_cal']), side='right')),
+                np.unique(np.searchsorted(pop_values, _slider_values(grid['min_pop']), side='left')))
+        shape = (len(tastes),) + tuple(len(axis) for axis in axes)
+        if np.prod(shape) > max_cells:
+            raise ValueError(f"Plan table would have {np.prod(shape):,} cells (max_cells={max_cells:,})")
+
+        # generate_flexible_combo's plan is greedy_taste_plan over the whole match set (see
+        # _ranked_search), and filters with fewer than min_count matches take the fallback plan.
+        # Every combo is put in ranked order once; each min_cal class then plans all of its
+        # (max_cal, min_pop) cells together (_Sweep).
+        index = recommender.combo_index()
+        ranked = index.ranked.astype(np.int64)
+        cands = PlanCandidates.from_store(store, ranked, positions=True)
+        cal_class = np.searchsorted(cal_values, total_calories[ranked])
+        pop_class = np.searchsorted(pop_values, avg_popularity[ranked])
+        min_count = max(10, 3 * days)
+        fallbacks = [tuple(generate_flexible_combo(recommender, taste, (1, 0), 2.0, days, positions=True))
+                     for taste in tastes]
+
+        plan_ids, plans = {}, []
+
+        def plan_id(picks):
+            if picks not in plan_ids:
+                plan_ids[picks] = len(plans)
+                plans.append(picks)
+            return plan_ids[picks]
+
+        fallback_ids = [plan_id(picks) for picks in fallbacks]
+        cells = np.empty(shape, dtype=np.int64)
+        cells[:] = np.array(fallback_ids)[:, None, None, None]
+        for i, a in enumerate(axes[0]):
+            sweep = _Sweep(cands, np.flatnonzero(cal_class >= a), cal_class, pop_class, axes[1], axes[2])
+            # Cells with too few matches keep the fallback plan
+            planned = np.flatnonzero(sweep.counts() >= min_count)
+            if len(planned) == 0:
+                continue
+            for t, taste in enumerate(tastes):
+                for found, picks in sweep.plans(planned, cands.taste_bit(taste), days):
+                    cells[t, i].flat[found] = plan_id(tuple(ranked[list(picks)].tolist()))
+
+        width = max([days] + [len(picks) for picks in plans])
+        plan_array = np.full((len(plans), width), -1, dtype=np.int64)
+        for i, picks in enumerate(plans):
+            plan_array[i, :len(picks)] = picks
+        meta = {
+            'version': TABLE_VERSION,
+            'menu_hash': menu_hash(recommender.data),
+            'scoring': recommender.scoring.to_dict(),
+            'tastes': list(tastes),
+            'grid': {name: list(bounds) for name, bounds in grid.items()},
+            'days': days,
+        }
+        cells = cells.astype(np.uint16 if len(plans) <= np.iinfo(np.uint16).max else np.uint32)
+        return cls(meta, cal_values, pop_values, axes, cells, plan_array)
+
+    def matches(self, recommender, days=3):
+        # Whether this table was built for the recommender's current menu, scoring and plan length
+        return (self.meta['menu_hash'] == menu_hash(recommender.data)
+                and self.meta['scoring'] == recommender.scoring.to_dict() and self.meta['days'] == days)
+
+    def lookup(self, preferred_taste, calorie_range, min_popularity):
+        # Combo positions of the plan, or None when the request falls outside the table
+        if preferred_taste not in self.tastes:
+            return None
+        classes = (np.searchsorted(self.cal_values, calorie_range[0], side='left'),
+                   np.searchsorted(self.cal_values, calorie_range[1], side='right'),
+                   np.searchsorted(self.pop_values, min_popularity, side='left'))
+        index = [self.tastes.index(preferred_taste)]
+        for axis, value in zip(self.axes, classes):
+            i = int(np.searchsorted(axis, value))
+            if i == len(axis) or axis[i] != value:
+                return None
+            index.append(i)
+        picks = self.plans[self.cells[tuple(index)]]
+        return picks[picks >= 0].tolist()
+
+    def combos(self, recommender, preferred_taste, calorie_range, min_popularity):
+        # Same rows generate_flexible_combo would return, or None when not in the table
+        picks = self.lookup(preferred_taste, calorie_range, min_popularity)
+        if picks is None:
+            return None
+        # Positions are generate_all_combos rows, so the frame comes straight from the items
+        # without building the combo store
+        picks = np.asarray(picks, dtype=np.int64)
+        items = recommender.items
+        frame = items.frame(np.unravel_index(picks, items.sizes), index=picks)
+        return [frame.iloc[i] for i in range(len(frame))]
+
+    @property
+    def nbytes(self):
+        return (self.cal_values.nbytes + self.pop_values.nbytes + sum(axis.nbytes for axis in self.axes)
+                + self.cells.nbytes + self.plans.nbytes)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp.npz')
+        np.savez_compressed(tmp, meta=np.array(json.dumps(self.meta)), cal_values=self.cal_values,
+                            pop_values=self.pop_values, min_cal=self.axes[0], max_cal=self.axes[1],
+                            min_pop=self.axes[2], cells=self.cells, plans=self.plans)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != TABLE_VERSION:
+                raise ValueError(f"Unsupported plan table version in {path}: {meta.get('version')}")
+            axes = (data['min_cal'], data['max_cal'], data['min_pop'])
+            return cls(meta, data['cal_values'], data['pop_values'], axes, data['cells'], data['plans'])
+
+
+def _slider_values(bounds):
+    # Every value a slider with these (low, high, step) bounds can be set to
+    low, high, step = bounds
+    return np.round(low + step * np.arange(int(round((high - low) / step)) + 1), 10)
+
+
+class _Sweep:
+    # greedy_taste_plan over the match sets of every (max_cal, min_pop) cell of one min_cal class
+    # at once. rows are the ranked rows (best first) at or above the min_cal class. A row passes
+    # cell (j, k) when its total's class is below b_axis[j] and its popularity's class is at least
+    # c_axis[k], i.e. for j >= its corner's j and k <= its corner's k. The first passing row of
+    # every cell is then a 2-D running minimum over the rows' corners.
+    def __init__(self, cands, rows, cal_class, pop_class, b_axis, c_axis):
+        j = np.searchsorted(b_axis, cal_class[rows], side='right')
+        k = np.searchsorted(c_axis, pop_class[rows], side='right') - 1
+        keep = (j < len(b_axis)) & (k >= 0)
+        self.rows = rows[keep]
+        self.shape = (len(b_axis), len(c_axis))
+        self.corners = np.ravel_multi_index((j[keep], k[keep]), self.shape)
+        # Last row of every cell, the same running extremum the other way round: scans stop there
+        last = np.full(self.shape, -1, dtype=np.int64)
+        np.maximum.at(last.reshape(-1), self.corners, np.arange(len(self.rows)))
+        last = np.maximum.accumulate(last, axis=0)
+        self.last = np.maximum.accumulate(last[:, ::-1], axis=1)[:, ::-1].ravel()
+        self.codes = cands.item_codes[self.rows]
+        self.masks = cands.taste_masks[self.rows]
+        self.n_items = cands.n_items
+        # Rows holding each item (CSR), to block a day's items in one go on long scans
+        by_item = np.argsort(self.codes.ravel(), kind='stable')
+        self.item_rows = by_item // self.codes.shape[1]
+        self.item_starts = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.codes.ravel(), minlength=self.n_items))])
+
+    def counts(self):
+        # Matches per cell, flattened
+        counts = np.bincount(self.corners, minlength=np.prod(self.shape)).reshape(self.shape)
+        return np.cumsum(np.cumsum(counts, axis=0)[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    def plans(self, cells, taste_bit, days):
+        # Yields (cells, picks) for the given flat cells, picks as ranked rows. Cells that pick the
+        # same combos so far share one search. Phases as in greedy_taste_plan: day 1 with the
+        # taste, then taste-disjoint days, then item-disjoint days. Each phase only scans the rows
+        # its taste test lets through, so a taste-disjoint day no combo fits is found quickly.
+        codes, masks = self.codes, self.masks
+        everything = np.arange(len(self.rows))
+        disjoint = {}
+        stack = [(cells, (), np.uint64(0), 0)]
+        while stack:
+            cells, picks, used_tastes, phase = stack.pop()
+            if len(picks) == days:
+                yield cells, self.rows[list(picks)]
+                continue
+            used_items = np.zeros(self.n_items, dtype=bool)
+            used_items[codes[list(picks)]] = True
+            if phase == 0:
+                candidates = np.flatnonzero((masks & taste_bit) != 0)
+            elif phase == 1:
+                if used_tastes not in disjoint:
+                    disjoint[used_tastes] = np.flatnonzero((masks & used_tastes) == 0)
+                candidates = disjoint[used_tastes]
+            else:
+                candidates = everything
+
+            blocked = []
+
+            def passes(rows):
+                # Short scans check item codes directly; longer ones first mark every row that
+                # shares an item with the picks
+                if len(rows) <= 256:
+                    used = used_items[codes[rows]]
+                    return ~(used[:, 0] | used[:, 1] | used[:, 2])
+                if not blocked:
+                    mask = np.zeros(len(self.rows), dtype=bool)
+                    for item in np.flatnonzero(used_items):
+                        mask[self.item_rows[self.item_starts[item]:self.item_starts[item + 1]]] = True
+                    blocked.append(mask)
+                return ~blocked[0][rows]
+
+            hits = self.first_hits(cells, candidates, passes)
+            missed = hits < 0
+            if missed.any():
+                if phase < 2:
+                    stack.append((cells[missed], picks, used_tastes, phase + 1))
+                else:
+                    yield cells[missed], self.rows[list(picks)]
+            for row in np.unique(hits[~missed]):
+                same = hits == row
+                tastes = used_tastes | masks[row] if phase < 2 else used_tastes
+                stack.append((cells[same], picks + (int(row),), tastes, max(phase, 1)))
+
+    def first_hits(self, cells, candidates, passes, chunk=256):
+        # For each cell, its first row among candidates (ascending row indices) that passes, or -1.
+        # Scans in doubling chunks, so cells that hit early never see the rest of the candidates,
+        # and cells past their last row drop out.
+        hits = np.full(len(cells), -1, dtype=np.int64)
+        pending = np.arange(len(cells))
+        none = len(self.rows)
+        start = 0
+        while len(pending) and start < len(candidates):
+            found = candidates[start:start + chunk]
+            found = found[passes(found)]
+            if len(found):
+                best = np.full(np.prod(self.shape), none, dtype=np.int64)
+                np.minimum.at(best, self.corners[found], found)
+                best = np.minimum.accumulate(best.reshape(self.shape), axis=0)
+                best = np.minimum.accumulate(best[:, ::-1], axis=1)[:, ::-1].ravel()[cells[pending]]
+                hit = best < none
+                hits[pending[hit]] = best[hit]
+                pending = pending[~hit]
+            if start + chunk < len(candidates):
+                pending = pending[self.last[cells[pending]] > candidates[start + chunk - 1]]
+            start += chunk
+            chunk *= 2
+        return hits
+
+
+def table_path(directory, recommender, days=3):
+    # One file per menu and scoring spec, so an edited menu simply misses and gets rebuilt
+    scoring = hashlib.sha1(json.dumps(recommender.scoring.to_dict(), sort_keys=True).encode()).hexdigest()
+    return Path(directory) / f"plans-{menu_hash(recommender.data)[:16]}-{scoring[:8]}-{days}d.npz"
+
+
+def load_table(directory, recommender, days=3):
+    # The prebuilt table for the recommender's menu and scoring, or None
+    path = table_path(directory, recommender, days)
+    if path.exists():
+        table = PlanTable.load(path)
+        if table.matches(recommender, days):
+            return table
+    return None
+
+
+def load_or_build(directory, recommender, days=3):
+    table = load_table(directory, recommender, days)
+    if table is None:
+        table = PlanTable.build(recommender, days=days)
+        table.save(table_path(directory, recommender, days))
+    return table
+
+
+def build_table(data, scoring, directory, days=3):
+    # TableBuilder's job, run in its worker process; returns the table's path
+    recommender = MenuRecommender(data, scoring)
+    load_or_build(directory, recommender, days)
+    return str(table_path(directory, recommender, days))
+
+
+class TableBuilder:
+    # Builds missing tables in one background process, so a build never holds the server's GIL.
+    # The table path carries the menu hash and scoring spec, so an edited menu is a new path and
+    # is rebuilt on its next submit(); each path is built at most once per builder, and a refused
+    # or failed build stays failed (status()) instead of being retried on every rerun.
+    def __init__(self, directory, days=3):
+        self.directory = directory
+        self.days = days
+        self._executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+        self._builds = {}
+        self._lock = threading.Lock()
+
+    def submit(self, recommender):
+        path = table_path(self.directory, recommender, self.days)
+        with self._lock:
+            if path not in self._builds and not path.exists():
+                self._builds[path] = self._executor.submit(build_table, recommender.data, recommender.scoring,
+                                                           self.directory, self.days)
+            return self._builds.get(path)
+
+    def status(self, recommender):
+        # 'ready', 'building', 'failed: <reason>' or None when never submitted
+        path = table_path(self.directory, recommender, self.days)
+        with self._lock:
+            build = self._builds.get(path)
+        if build is None:
+            return 'ready' if path.exists() else None
+        if not build.done():
+            return 'building'
+        error = build.exception()
+        return f"failed: {error}" if error is not None else 'ready'
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute the plan table for the app\'s control grid.')
+    parser.add_argument('--menu', help='menu CSV/Parquet export or snapshot directory (default: built-in sample menu)')
+    parser.add_argument('--menu-dir', help='build a table for every restaurant in this directory (the app\'s MENU_DIR)')
+    parser.add_argument('--out-dir', default='.plan_tables', help='table directory, the app\'s PLAN_TABLE_DIR')
+    parser.add_argument('--days', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.menu_dir:
+        menus = MenuDirectory(args.menu_dir)
+        sources = [(restaurant, lambda restaurant=restaurant: menus(restaurant)) for restaurant in menus.restaurants()]
+    else:
+        sources = [(args.menu or 'sample menu', lambda: load_menu_frame(args.menu) if args.menu else load_menu_data())]
+    for name, load in sources:
+        recommender = MenuRecommender(load())
+        start = time.perf_counter()
+        try:
+            table = load_or_build(args.out_dir, recommender, args.days)
+        except ValueError as exc:
+            # Too large to tabulate; the app plans this menu live
+            print(f"{name}: skipped, {exc}")
+            continue
+        print(f"{name}: {table_path(args.out_dir, recommender, args.days)}: {len(table.plans)} plans, "
+              f"{table.cells.size:,} cells, {table.nbytes / 1024:.0f} KB in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
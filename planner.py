@@ -0,0 +1,321 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+ITEM_COLUMNS = ['main', 'side', 'drink']
+TASTE_COLUMNS = ['main_taste', 'side_taste', 'drink_taste']
+
+
+class PlanCandidates:
+    # Ranked combos (best first) with items as integer codes and tastes as bitmasks,
+    # so disjointness checks are array lookups instead of Python set intersections
+    def __init__(self, item_codes, n_items, taste_codes, tastes, scores, take):
+        self.item_codes = item_codes
+        self.n_items = n_items
+        self.tastes = tastes
+        if len(tastes) > 64:
+            raise ValueError("At most 64 distinct taste profiles are supported")
+        bits = np.left_shift(np.uint64(1), taste_codes.astype(np.uint64))
+        self.taste_masks = np.bitwise_or.reduce(bits, axis=1) if len(bits) else np.zeros(0, dtype=np.uint64)
+        self.scores = scores
+        self._take = take
+
+    # With positions=True, rows() returns the picked combos' generate_all_combos positions
+    # instead of materialized rows
+
+    @classmethod
+    def from_frame(cls, combos, positions=False):
+        item_codes, items = pd.factorize(combos[ITEM_COLUMNS].to_numpy().ravel())
+        taste_codes, tastes = pd.factorize(combos[TASTE_COLUMNS].to_numpy().ravel())
+        if positions:
+            take = lambda picks: combos.index[picks].tolist()  # noqa: E731
+        else:
+            take = lambda picks: [combos.iloc[pos] for pos in picks]  # noqa: E731
+        return cls(item_codes.reshape(-1, len(ITEM_COLUMNS)), len(items),
+                   taste_codes.reshape(-1, len(TASTE_COLUMNS)), tastes, combos['combo_score'].to_numpy(), take)
+
+    @classmethod
+    def from_store(cls, store, rows, positions=False):
+        # Codes come straight from the ItemStore; names are only materialized for the picked rows
+        items = store.items
+        idx = store.triples(rows)
+        item_codes = np.column_stack([items.name_codes[axis][idx[axis]] for axis in range(3)])
+        taste_codes = np.column_stack([items.taste_codes[axis][idx[axis]] for axis in range(3)])
+
+        def take(picks):
+            if positions:
+                return rows[picks].tolist()
+            frame = store.frame(rows[picks])
+            return [frame.iloc[i] for i in range(len(frame))]
+
+        return cls(item_codes, items.n_names, taste_codes, items.tastes, store.combo_score[rows], take)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def taste_bit(self, taste):
+        # Plain list scan: the taste list is tiny, and comparing a pandas Index costs far more
+        for code, name in enumerate(self.tastes):
+            if name == taste:
+                return np.uint64(1) << np.uint64(code)
+        return np.uint64(0)
+
+    def item_free(self, used_items):
+        return ~used_items[self.item_codes].any(axis=1)
+
+    def rows(self, picks):
+        return self._take(list(picks))
+
+    def subset(self, keep):
+        # The candidates with keep set, still best first; rows() maps picks back to this table's rows
+        positions = np.flatnonzero(keep)
+        sub = copy.copy(self)
+        sub.item_codes = self.item_codes[positions]
+        sub.taste_masks = self.taste_masks[positions]
+        sub.scores = self.scores[positions]
+        sub._take = lambda picks: self._take(positions[picks].tolist())
+        return sub
+
+
+def _first(mask, start=0):
+    hits = np.flatnonzero(mask[start:])
+    return start + hits[0] if len(hits) else None
+
+
+def _take(cands, pos, picks, used_items):
+    picks.append(pos)
+    used_items[cands.item_codes[pos]] = True
+
+
+def _fill(cands, days, picks):
+    # Last resort once no item-disjoint combo is left: best combos not already in the plan
+    for pos in range(len(cands)):
+        if len(picks) >= days:
+            break
+        if pos not in picks:
+            picks.append(pos)
+
+
+def greedy_plan(cands, days, ensure_diversity=True):
+    # Best remaining combo each day, skipping any that reuses an item already planned
+    picks, used_items = [], np.zeros(cands.n_items, dtype=bool)
+    while len(picks) < days:
+        if ensure_diversity:
+            pos = _first(cands.item_free(used_items))
+        else:
+            pos = len(picks) if len(picks) < len(cands) else None
+        if pos is None:
+            break
+        _take(cands, pos, picks, used_items)
+    settled = len(picks) == days
+    _fill(cands, days, picks)
+    return picks, settled
+
+
+def greedy_taste_plan(cands, days, preferred_taste):
+    # Day 1 must include preferred_taste, later days prefer tastes not used yet, and every
+    # day is item-disjoint from the others when possible
+    picks, used_items = [], np.zeros(cands.n_items, dtype=bool)
+    used_tastes = np.uint64(0)
+
+    pos = _first((cands.taste_masks & cands.taste_bit(preferred_taste)) != 0)
+    if pos is not None:
+        _take(cands, pos, picks, used_items)
+        used_tastes |= cands.taste_masks[pos]
+    found_first = pos is not None
+
+    while len(picks) < days:
+        pos = _first(cands.item_free(used_items) & ((cands.taste_masks & used_tastes) == 0))
+        if pos is None:
+            break
+        _take(cands, pos, picks, used_items)
+        used_tastes |= cands.taste_masks[pos]
+    settled = found_first and len(picks) == days
+
+    while len(picks) < days:
+        pos = _first(cands.item_free(used_items))
+        if pos is None:
+            break
+        _take(cands, pos, picks, used_items)
+    return picks, settled
+
+
+def beam_plan(cands, days, preferred_taste=None, distinct_tastes=False, beam_width=8):
+    # Bounded beam search maximizing the plan's total combo_score. Day 1 may be any combo with
+    # preferred_taste; later days are added in rank order so each plan is reached only once.
+    first_ok = np.ones(len(cands), dtype=bool)
+    if preferred_taste is not None:
+        first_ok = (cands.taste_masks & cands.taste_bit(preferred_taste)) != 0
+
+    beam = []
+    for pos in np.flatnonzero(first_ok)[:beam_width]:
+        used_items = np.zeros(cands.n_items, dtype=bool)
+        used_items[cands.item_codes[pos]] = True
+        beam.append((cands.scores[pos], [pos], used_items, cands.taste_masks[pos]))
+
+    complete = [state for state in beam if len(state[1]) == days]
+    for _ in range(1, days):
+        expanded = []
+        for total, picks, used_items, used_tastes in beam:
+            ok = cands.item_free(used_items)
+            if distinct_tastes:
+                ok &= (cands.taste_masks & used_tastes) == 0
+            start = picks[-1] + 1 if len(picks) > 1 else 0
+            for pos in np.flatnonzero(ok[start:])[:beam_width] + start:
+                next_used = used_items.copy()
+                next_used[cands.item_codes[pos]] = True
+                expanded.append((total + cands.scores[pos], picks + [pos], next_used,
+                                 used_tastes | cands.taste_masks[pos]))
+        if not expanded:
+            break
+        expanded.sort(key=lambda state: -state[0])
+        beam = expanded[:beam_width]
+        complete = [state for state in beam if len(state[1]) == days]
+
+    if complete:
+        return [int(pos) for pos in complete[0][1]], True
+    best = max(beam, key=lambda state: (len(state[1]), state[0]), default=None)
+    return ([int(pos) for pos in best[1]] if best else []), False
+
+
+def plan_score(cands, picks):
+    return float(cands.scores[picks].sum()) if picks else 0.0
+
+
+# Search-driven greedy planning for catalogs too large to rank up front. One top-k search (the
+# pool, best first) is shared by every day: the first pool row that fits a day's restrictions is
+# the best such combo anywhere, since everything outside the pool scores no higher. Only when no
+# pool row fits does a day run its own pruned top_combos(1) search restricted to the items still
+# allowed, which picks the same combo as scanning the full ranked table for the first compatible
+# row. A pool smaller than its k holds every match, so nothing outside it needs searching.
+
+def _categories(recommender):
+    return recommender.main_items, recommender.side_items, recommender.drink_items
+
+
+def _allowed(recommender, used_items=(), banned_tastes=()):
+    return [~items['item_name'].isin(used_items).to_numpy() & ~items['taste_profile'].isin(banned_tastes).to_numpy()
+            for items in _categories(recommender)]
+
+
+def _best(found):
+    # Highest combo_score, ties to the earliest generate_all_combos position
+    found = [combos for combos in found if len(combos)]
+    if not found:
+        return None
+    return min((combos.iloc[0] for combos in found), key=lambda row: (-row['combo_score'], row.name))
+
+
+class _Days:
+    # Picks of one search-driven plan and the pool they are drawn from. Past the deadline a day
+    # that the pool cannot answer is not searched; the plan is then reported as interrupted,
+    # with the pool's last score bounding anything the skipped searches could have found.
+    def __init__(self, recommender, pool, complete, calorie_range, min_popularity, deadline):
+        self.recommender = recommender
+        self.pool = pool
+        self.complete = complete
+        self.calorie_range = calorie_range
+        self.min_popularity = min_popularity
+        self.deadline = deadline
+        # Items and tastes of each pool row, read once rather than per day
+        self.pool_items = [set(row) for row in zip(*(pool[column].tolist() for column in ITEM_COLUMNS))]
+        self.pool_tastes = [set(row) for row in zip(*(pool[column].tolist() for column in TASTE_COLUMNS))]
+        self.skipped = False
+        self.picks = []
+        self.used_items = set()
+        self.used_tastes = set()
+
+    def best(self, used_items=(), banned_tastes=()):
+        # Best combo with no used item and no banned taste
+        ok = [items.isdisjoint(used_items) and tastes.isdisjoint(banned_tastes)
+              for items, tastes in zip(self.pool_items, self.pool_tastes)]
+        return self.first(ok, lambda: [_allowed(self.recommender, used_items, banned_tastes)])
+
+    def first(self, ok, searches):
+        # First pool row where ok holds, else the best of the restricted searches (a callable
+        # returning their allowed masks, only built when the pool has no such row)
+        hits = np.flatnonzero(ok)
+        if len(hits):
+            return self.pool.iloc[hits[0]]
+        if self.complete:
+            return None
+        if self.deadline is not None and self.deadline.expired():
+            self.skipped = True
+            return None
+        return _best([self.recommender.top_combos(1, self.calorie_range, self.min_popularity, allowed, self.deadline)
+                      for allowed in searches()])
+
+    def take(self, row, tastes=False):
+        self.picks.append(row)
+        self.used_items.update(row[column] for column in ITEM_COLUMNS)
+        if tastes:
+            self.used_tastes.update(row[column] for column in TASTE_COLUMNS)
+
+    def fill(self, days):
+        # Best pool combos not already in the plan; the pool holds the top 2 * days combos
+        # whenever it can, so this matches scanning the full ranked table
+        taken = {row.name for row in self.picks}
+        pool = self.pool
+        if not self.complete and len(pool) < 2 * days:
+            pool = self.recommender.top_combos(2 * days, self.calorie_range, self.min_popularity,
+                                               deadline=self.deadline)
+        for i in range(len(pool)):
+            if len(self.picks) >= days:
+                break
+            if pool.index[i] not in taken:
+                self.picks.append(pool.iloc[i])
+
+    def result(self, days):
+        if self.skipped:
+            # Short of days only when the deadline cut the item-disjoint searches: repeat items
+            self.fill(days)
+            if self.picks and not self.complete:
+                self.deadline.interrupt(self.pool['combo_score'].iloc[-1],
+                                        min(row['combo_score'] for row in self.picks))
+        return self.picks
+
+
+def search_greedy_plan(recommender, days, calorie_range, min_popularity, ensure_diversity=True, deadline=None,
+                       pool=None, pool_size=None):
+    # pool: the top pool_size combos for the filters, best first (searched here when not given)
+    plan = _search_days(recommender, calorie_range, min_popularity, deadline, pool, pool_size or 2 * days)
+    while ensure_diversity and len(plan.picks) < days:
+        row = plan.best(plan.used_items)
+        if row is None:
+            break
+        plan.take(row)
+    plan.fill(days)
+    return plan.result(days)
+
+
+def search_taste_plan(recommender, days, preferred_taste, calorie_range, min_popularity, deadline=None, pool=None,
+                      pool_size=None):
+    plan = _search_days(recommender, calorie_range, min_popularity, deadline, pool, pool_size or 2 * days)
+
+    # Day 1 → best combo with preferred_taste in any of its three slots
+    def searches():
+        found = []
+        for slot, items in enumerate(_categories(recommender)):
+            allowed = _allowed(recommender)
+            allowed[slot] &= items['taste_profile'].to_numpy() == preferred_taste
+            found.append(allowed)
+        return found
+
+    row = plan.first([preferred_taste in tastes for tastes in plan.pool_tastes], searches)
+    if row is not None:
+        plan.take(row, tastes=True)
+
+    for banned in (plan.used_tastes, ()):
+        while len(plan.picks) < days:
+            row = plan.best(plan.used_items, banned)
+            if row is None:
+                break
+            plan.take(row, tastes=banned is plan.used_tastes)
+    return plan.result(days)
+
+
+def _search_days(recommender, calorie_range, min_popularity, deadline, pool, pool_size):
+    if pool is None:
+        pool = recommender.top_combos(pool_size, calorie_range, min_popularity, deadline=deadline)
+    return _Days(recommender, pool, len(pool) < pool_size, calorie_range, min_popularity, deadline)
@@ -0,0 +1,86 @@
+import numpy as np
+
+FEATURES = ('total_calories', 'avg_popularity', 'taste_diversity')
+
+
+class ScoringSpec:
+    # combo_score = avg_popularity * taste_diversity * popularity_weight
+    #             + (calorie_scale - |total_calories - calorie_target|) * calorie_weight
+    #             + sum(weight * feature) over extra_terms, e.g. {'taste_diversity': 0.05}
+    # The defaults are the original calculate_combo_score formula and reproduce it bit for bit.
+    def __init__(self, popularity_weight=0.1, calorie_target=800, calorie_weight=0.001, calorie_scale=1000,
+                 extra_terms=None):
+        self.popularity_weight = popularity_weight
+        self.calorie_target = calorie_target
+        self.calorie_weight = calorie_weight
+        self.calorie_scale = calorie_scale
+        self.extra_terms = dict(extra_terms or {})
+        unknown = sorted(set(self.extra_terms) - set(FEATURES))
+        if unknown:
+            raise ValueError(f"Unknown scoring features: {', '.join(unknown)} (use {', '.join(FEATURES)})")
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls(**params)
+
+    def to_dict(self):
+        return {
+            'popularity_weight': self.popularity_weight,
+            'calorie_target': self.calorie_target,
+            'calorie_weight': self.calorie_weight,
+            'calorie_scale': self.calorie_scale,
+            'extra_terms': dict(self.extra_terms),
+        }
+
+    def key(self):
+        return (self.popularity_weight, self.calorie_target, self.calorie_weight, self.calorie_scale,
+                tuple(sorted(self.extra_terms.items())))
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringSpec) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"ScoringSpec({', '.join(f'{name}={value!r}' for name, value in self.to_dict().items())})"
+
+    def score(self, total_calories, avg_popularity, taste_diversity):
+        combo_score = (avg_popularity * taste_diversity * self.popularity_weight
+                       + (self.calorie_scale - np.abs(total_calories - self.calorie_target)) * self.calorie_weight)
+        features = {'total_calories': total_calories, 'avg_popularity': avg_popularity,
+                    'taste_diversity': taste_diversity}
+        for feature, weight in self.extra_terms.items():
+            combo_score = combo_score + features[feature] * weight
+        return combo_score
+
+    # Upper bounds for the pruned top-k search. Popularity scores are taken to be non-negative.
+
+    def popularity_bound(self, popularity_sum):
+        # Best popularity/diversity terms for three-item combos whose popularities sum to at most
+        # popularity_sum; nondecreasing in popularity_sum
+        return self.average_bound(popularity_sum / 3, 3)
+
+    def average_bound(self, avg_popularity, max_diversity):
+        # Best popularity/diversity terms for avg_popularity at most the given value, over every
+        # diversity 1..max_diversity; nondecreasing in avg_popularity
+        avg_weight = self.extra_terms.get('avg_popularity', 0)
+        diversity_weight = self.extra_terms.get('taste_diversity', 0)
+        return np.maximum.reduce([
+            max(self.popularity_weight * diversity + avg_weight, 0) * avg_popularity
+            + diversity_weight * diversity
+            for diversity in range(1, max_diversity + 1)])
+
+    def calorie_bound(self, low, high):
+        # Best calorie terms for total_calories in [low, high]; the terms are piecewise linear with
+        # one kink at the target, so the maximum is at an end of the interval or at the target.
+        # Works elementwise on arrays of intervals.
+        total_weight = self.extra_terms.get('total_calories', 0)
+
+        def term(total):
+            return ((self.calorie_scale - np.abs(total - self.calorie_target)) * self.calorie_weight
+                    + total * total_weight)
+        nearest = np.minimum(np.maximum(self.calorie_target, low), high)
+        return np.maximum(np.maximum(term(low), term(high)), term(nearest))
+
+DEFAULT_SCORING = ScoringSpec()
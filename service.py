@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from catalog import MenuDirectory, load_menu_frame
+from deadline import Deadline
+from engine_cache import EnginePool
+from model import MenuRecommender, generate_flexible_combo, load_menu_data, plan_records, DAYS
+from scoring import ScoringSpec
+
+MAX_BODY = 64 * 1024
+
+
+def _finite(name, value):
+    # float() accepts 'nan' and 'inf', which would slip past every range check downstream
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number, got {value!r}")
+    return number
+
+
+class PlanService:
+    # One warm engine per process, or with a pool one per restaurant (the `restaurant` parameter);
+    # planning runs on a small thread pool so the event loop keeps accepting connections while a
+    # plan is being computed
+    def __init__(self, data=None, threads=4, pool=None):
+        self.pool = pool
+        self.engine = MenuRecommender(data).warm() if pool is None else None
+        self.executor = ThreadPoolExecutor(threads)
+        self.scored = OrderedDict()
+        self.max_scored = 16
+        self._lock = threading.Lock()
+
+    def base_engine(self, restaurant):
+        if self.pool is None:
+            if restaurant:
+                raise ValueError("This service has a single menu; drop the restaurant parameter")
+            return self.engine
+        if not restaurant:
+            raise ValueError("restaurant is required")
+        return self.pool.get(str(restaurant))
+
+    def engine_for(self, scoring, restaurant=None):
+        # Custom weights get their own engine sharing the base one's combo features. With a pool
+        # the pool keeps them per restaurant (EngineCache.scored); the single engine keeps the
+        # most recently used max_scored of them here.
+        engine = self.base_engine(restaurant)
+        if not scoring:
+            return engine
+        spec = ScoringSpec.from_dict(json.loads(scoring) if isinstance(scoring, str) else scoring)
+        if self.pool is not None:
+            return self.pool.scored(str(restaurant), spec)
+        with self._lock:
+            if spec not in self.scored:
+                self.scored[spec] = engine.with_scoring(spec)
+                while len(self.scored) > self.max_scored:
+                    self.scored.popitem(last=False)
+            self.scored.move_to_end(spec)
+            return self.scored[spec]
+
+    def plan(self, params):
+        preferred_taste = params.get('taste') or None
+        calorie_range = (int(params.get('min_cal', 700)), int(params.get('max_cal', 900)))
+        min_popularity = _finite('min_pop', params.get('min_pop', 0.7))
+        days = int(params.get('days', 3))
+        mode = params.get('mode', 'greedy')
+        start_day = params.get('start_day') or None
+        deadline_ms = params.get('deadline_ms')
+        if start_day is not None and start_day not in DAYS:
+            raise ValueError(f"Unknown start day: {start_day!r}")
+        if not 1 <= days <= 366:
+            raise ValueError("days must be between 1 and 366")
+        engine = self.base_engine(params.get('restaurant'))
+        if preferred_taste is not None and preferred_taste not in engine.items.tastes:
+            raise ValueError(f"Unknown taste profile: {preferred_taste!r}")
+        engine = self.engine_for(params.get('scoring'), params.get('restaurant'))
+        # Latency budget: the best plan found within it, with a quality report
+        deadline = Deadline(_finite('deadline_ms', deadline_ms)) if deadline_ms not in (None, '') else None
+
+        if preferred_taste:
+            combos = generate_flexible_combo(engine, preferred_taste, calorie_range, min_popularity,
+                                             days=days, mode=mode, deadline=deadline)
+        else:
+            combos = engine.recommend_menu(days, calorie_range, min_popularity, mode=mode, deadline=deadline)
+        result = {'plan': plan_records(combos, preferred_taste, calorie_range, min_popularity, start_day)}
+        if deadline is not None:
+            result['quality'] = deadline.report()
+        return result
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'pid': os.getpid()}
+        if url.path == '/metrics':
+            # Per process: with --workers > 1 each request lands on one worker's engine. With a pool,
+            # the pool's hit/miss/eviction stats; ?restaurant= adds that engine's metrics.
+            if self.pool is None:
+                return HTTPStatus.OK, dict(self.engine.metrics.snapshot(), pid=os.getpid())
+            payload = {'pid': os.getpid()}
+            restaurant = dict(parse_qsl(url.query)).get('restaurant')
+            if restaurant:
+                try:
+                    payload.update(self.pool.get(restaurant).metrics.snapshot())
+                except ValueError as exc:
+                    return HTTPStatus.BAD_REQUEST, {'error': str(exc)}
+            return HTTPStatus.OK, dict(payload, pool=self.pool.stats())
+        if url.path != '/plan':
+            return HTTPStatus.NOT_FOUND, {'error': 'not found'}
+        if method not in ('GET', 'POST'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'use GET or POST'}
+
+        params = dict(parse_qsl(url.query))
+        try:
+            if body:
+                params.update(json.loads(body))
+            loop = asyncio.get_running_loop()
+            return HTTPStatus.OK, await loop.run_in_executor(self.executor, self.plan, params)
+        except (ValueError, TypeError) as exc:
+            return HTTPStatus.BAD_REQUEST, {'error': str(exc)}
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive, enough for the ordering backend and the load test
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'body too large'}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method, target, body)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive or body is None:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve(sock, data, threads, menu_dir=None, memory_budget=None):
+    pool = None
+    if menu_dir:
+        pool = EnginePool(MenuDirectory(menu_dir), max_bytes=memory_budget and int(memory_budget * 2 ** 20))
+    service = PlanService(data, threads, pool)
+
+    async def run():
+        server = await asyncio.start_server(service.handle, sock=sock)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve menu plans over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--menu', help='menu CSV/Parquet export or snapshot directory (default: built-in sample menu)')
+    parser.add_argument('--menu-dir', help='directory with one menu per restaurant (<id>.csv, <id>.parquet or '
+                                           '<id>.snapshot); plans then take a restaurant parameter')
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help='MB of warm engines per worker with --menu-dir, least recently used evicted first')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes sharing the port')
+    parser.add_argument('--threads', type=int, default=4, help='planning threads per worker')
+    args = parser.parse_args()
+
+    if args.menu_dir:
+        data = None
+    else:
+        data = load_menu_frame(args.menu) if args.menu else load_menu_data()
+    sock = socket.create_server((args.host, args.port), reuse_port=hasattr(socket, 'SO_REUSEPORT'))
+    print(f"Serving plans on http://{args.host}:{args.port}/plan with {args.workers} worker(s)")
+
+    serve_args = (sock, data, args.threads, args.menu_dir, args.memory_budget)
+    if args.workers == 1:
+        serve(*serve_args)
+        return
+    workers = [multiprocessing.Process(target=serve, args=serve_args) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from batch import plan_batch
+
+REQUESTS = pd.DataFrame({
+    'customer_id': list(range(8)),
+    'preferred_taste': ['spicy', '', 'sweet', 'spicy', '', 'sweet', 'spicy', ''],
+    'min_cal': [700, 600, 700, 700, 'bad', 700, 700, 600],
+    'days': [3, 2, 3, 3, 2, 3, 0, 2],
+})
+
+
+def test_records_follow_request_order():
+    serial = list(plan_batch(REQUESTS, workers=1))
+    assert [record['customer_id'] for record in serial] == list(range(8))
+    assert ['error' in record for record in serial] == [False, False, False, False, True, False, True, False]
+    assert serial[3]['plan'] == serial[0]['plan']
+    assert list(plan_batch(REQUESTS, workers=2)) == serial
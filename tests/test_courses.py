@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from courses import CourseItems, top_course_positions
+from scoring import ScoringSpec
+from synthetic_menu import EXTRA_PROFILES, synthetic_menu
+
+SPECS = [ScoringSpec(), ScoringSpec(0.3, 650), ScoringSpec(-0.1), ScoringSpec(extra_terms={'taste_diversity': -0.2})]
+
+
+def brute_force(items, k, calorie_range, min_popularity):
+    positions = np.arange(items.n_combos)
+    total_calories, avg_popularity, _, scores = items.features(np.unravel_index(positions, items.sizes))
+    keep = np.ones(len(positions), dtype=bool)
+    if calorie_range is not None:
+        keep &= (total_calories >= calorie_range[0]) & (total_calories <= calorie_range[1])
+    if min_popularity is not None:
+        keep &= avg_popularity >= min_popularity
+    order = np.lexsort((positions[keep], -scores[keep]))[:k]
+    return positions[keep][order], scores[keep][order]
+
+
+@pytest.mark.parametrize('spec', SPECS)
+@pytest.mark.parametrize('schema', ['starter?,main,side,drink,dessert?', 'starter,main,side,drink,dessert'])
+def test_seeded_join_matches_brute_force(schema, spec):
+    # seed_combos=50 seeds every level of the search, down to a few options per course
+    items = CourseItems(synthetic_menu(6, 1, extra_courses=tuple(EXTRA_PROFILES)), schema, spec)
+    for k in (1, 10, 200):
+        for calorie_range, min_popularity in [(None, None), ((700, 900), 0.7), ((1100, 1300), None)]:
+            got = top_course_positions(items, k, calorie_range, min_popularity, seed_combos=50)
+            want = brute_force(items, k, calorie_range, min_popularity)
+            assert np.array_equal(got[0], want[0])
+            assert np.allclose(got[1], want[1])
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import MenuRecommender, load_menu_data
+from synthetic_menu import synthetic_menu
+
+FIELDS = ('ranked', 'rank', 'rows', 'calories', 'bucket_keys', 'bucket_starts')
+
+
+def edit(recommender, rng, step):
+    names = recommender.data['item_name'].tolist()
+    op = rng.integers(4)
+    if op == 0:
+        recommender.update_item(names[rng.integers(len(names))], popularity_score=rng.integers(101) / 100)
+    elif op == 1:
+        recommender.update_item(names[rng.integers(len(names))], calories=int(rng.integers(5, 90)) * 10)
+    elif op == 2 or min(recommender.items.sizes) < 2:
+        recommender.add_item(f'New {step}', ('main', 'side', 'drink')[rng.integers(3)], int(rng.integers(5, 90)) * 10,
+                             ('spicy', 'savory', 'sweet', 'sour')[rng.integers(4)], rng.integers(101) / 100)
+    else:
+        recommender.remove_item(names[rng.integers(len(names))])
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_patched_index_matches_a_fresh_rebuild(seed):
+    # Every patched index must be exactly the index a fresh engine builds from the edited menu
+    rng = np.random.default_rng(seed)
+    recommender = MenuRecommender(synthetic_menu(int(rng.integers(2, 10)), seed) if seed else load_menu_data())
+    recommender.warm()
+    for step in range(20):
+        edit(recommender, rng, step)
+        fresh = MenuRecommender(recommender.data.copy())
+        pd.testing.assert_frame_equal(recommender.generate_all_combos(), fresh.generate_all_combos())
+        for field in FIELDS:
+            patched, rebuilt = getattr(recommender.combo_index(), field), getattr(fresh.combo_index(), field)
+            assert patched.dtype == rebuilt.dtype and np.array_equal(patched, rebuilt), field
@@ -0,0 +1,26 @@
+from engine_cache import EnginePool
+from scoring import ScoringSpec
+from synthetic_menu import synthetic_menu
+
+SPEC = ScoringSpec(calorie_target=650)
+
+
+def test_scored_engines_live_and_die_with_their_restaurant():
+    menus = {name: synthetic_menu(10, seed) for seed, name in enumerate('abc')}
+    pool = EnginePool(menus.__getitem__)
+    base = pool.get('a')
+    scored = pool.scored('a', SPEC)
+    assert pool.scored('a', SPEC) is scored
+    assert pool.stats()['bytes'] == base.nbytes + scored.scoring_nbytes > base.nbytes
+
+    # Only what rescoring adds is counted, so the budget fits one restaurant with its variant
+    pool.max_bytes = pool.stats()['bytes'] + base.nbytes // 2
+    pool.get('b')
+    assert [key for key, _ in pool.restaurants()] == ['b']
+    assert pool.stats()['scored'] == 0
+
+    rescored = pool.scored('a', SPEC)
+    assert rescored is not scored and pool.stats()['scored'] == 1
+    pool.update('a', lambda engine: engine.update_item(engine.data['item_name'].iloc[0], calories=400))
+    assert pool.stats()['scored'] == 0
+    assert pool.scored('a', SPEC) is not rescored
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from model import MenuRecommender, generate_flexible_combo
+from plan_table import PlanTable, TableBuilder, load_table
+from synthetic_menu import synthetic_menu
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_lookups_match_live_plans(seed):
+    recommender = MenuRecommender(synthetic_menu(8, seed))
+    table = PlanTable.build(recommender)
+    rng = random.Random(seed)
+    for _ in range(100):
+        taste = rng.choice(table.tastes)
+        calorie_range = (rng.randint(500, 1000), rng.randint(600, 1200))
+        min_popularity = rng.randint(0, 100) / 100
+        assert table.lookup(taste, calorie_range, min_popularity) == list(
+            generate_flexible_combo(recommender, taste, calorie_range, min_popularity, positions=True))
+
+
+def test_builder_builds_edited_menus_once(tmp_path):
+    recommender = MenuRecommender(synthetic_menu(6))
+    builder = TableBuilder(tmp_path)
+    try:
+        assert builder.status(recommender) is None
+        builder.submit(recommender).result(timeout=120)
+        assert builder.status(recommender) == 'ready'
+        assert load_table(tmp_path, recommender) is not None
+
+        edited = recommender.copy()
+        edited.update_item(edited.data['item_name'].iloc[0], calories=400)
+        assert load_table(tmp_path, edited) is None
+        build = builder.submit(edited)
+        assert builder.submit(edited) is build
+        build.result(timeout=120)
+        assert load_table(tmp_path, edited).matches(edited)
+    finally:
+        builder.shutdown()
@@ -0,0 +1,56 @@
+import pytest
+
+from model import MenuRecommender, generate_flexible_combo
+from synthetic_menu import synthetic_menu
+
+TASTES = tuple(f'taste{i}' for i in range(9))
+QUERIES = [((700, 900), 0.7), ((600, 1000), 0.5), ((500, 1200), 0.0)]
+
+
+def taste_sets(plan):
+    return [{combo['main_taste'], combo['side_taste'], combo['drink_taste']} for combo in plan]
+
+
+def disjoint(plan):
+    seen = set()
+    for tastes in taste_sets(plan):
+        if tastes & seen:
+            return False
+        seen |= tastes
+    return True
+
+
+@pytest.mark.parametrize('searched', [False, True])
+@pytest.mark.parametrize('seed', range(10))
+def test_beam_keeps_later_days_taste_disjoint(seed, searched):
+    # Whenever the greedy taste plan keeps every day on new tastes, the beam plan must too, and
+    # score at least as much in total, on the ranked-index path and on the search path
+    recommender = MenuRecommender(synthetic_menu(12, seed, tastes=TASTES))
+    if searched:
+        recommender.max_indexed_combos = 0
+    for calorie_range, min_popularity in QUERIES:
+        for taste in TASTES[:3]:
+            greedy = generate_flexible_combo(recommender, taste, calorie_range, min_popularity)
+            beam = generate_flexible_combo(recommender, taste, calorie_range, min_popularity, mode='beam')
+            assert len(beam) == len(greedy) == 3
+            if disjoint(greedy) and taste in taste_sets(greedy)[0]:
+                assert disjoint(beam)
+                assert taste in taste_sets(beam)[0]
+                assert sum(c['combo_score'] for c in beam) >= sum(c['combo_score'] for c in greedy) - 1e-9
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_and_search_paths_agree(seed):
+    # The indexed path hands unsettled prefixes to the same pruned searches the search path runs
+    indexed = MenuRecommender(synthetic_menu(15, seed))
+    searched = MenuRecommender(synthetic_menu(15, seed))
+    searched.max_indexed_combos = 0
+    for calorie_range, min_popularity in QUERIES:
+        for mode in ('greedy', 'beam'):
+            for taste in ('spicy', 'sweet', 'savory'):
+                plans = [generate_flexible_combo(engine, taste, calorie_range, min_popularity, mode=mode,
+                                                 positions=True) for engine in (indexed, searched)]
+                assert plans[0] == plans[1]
+            plans = [engine.recommend_menu(5, calorie_range, min_popularity, mode=mode)
+                     for engine in (indexed, searched)]
+            assert [combo.name for combo in plans[0]] == [combo.name for combo in plans[1]]